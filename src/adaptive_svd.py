@@ -0,0 +1,228 @@
+"""
+This module provides truncated SVDs that compute only as many singular
+triplets as needed to explain a fraction of the variance of the spectra.
+It includes the following functionalities:
+
+1. A randomized SVD growing its subspace block by block until the variance
+   threshold is reached.
+2. An incremental SVD updated over row chunks, for data read from disk.
+3. Selecting the rank from the explained variance ratios, as read off
+   TruncatedSVD.explained_variance_ratio_, and returning the denoised
+   spectra as LowRankSpectra.
+
+"""
+
+from typing import Iterator, Optional
+
+import numpy as np
+
+from .low_rank_spectra import LowRankSpectra
+
+
+def _total_variance(X: np.ndarray, block_rows: int = 4096) -> float:
+    """
+    Calculate the sum of the column variances of the data in blocks of rows.
+
+    Parameters:
+    X (numpy.ndarray | LowRankSpectra): The data, possibly memory-mapped.
+    block_rows (int): The number of rows read at a time.
+
+    Returns:
+    float: The total variance.
+    """
+    n_samples = X.shape[0]
+    sums = np.zeros(X.shape[1])
+    squares = 0.0
+    for start in range(0, n_samples, block_rows):
+        block = np.asarray(X[start:start + block_rows], dtype=np.float64)
+        sums += block.sum(axis=0)
+        squares += np.einsum('ij,ij->', block, block)
+    return float(squares / n_samples - (sums / n_samples) @ (sums / n_samples))
+
+
+def explained_variance_ratio(U: np.ndarray, S: np.ndarray,
+                             total_variance: float) -> np.ndarray:
+    """
+    Calculate the fraction of the variance explained by every singular
+    triplet, as TruncatedSVD.explained_variance_ratio_ does.
+
+    Parameters:
+    U (numpy.ndarray): The (n_samples, r) left singular vectors.
+    S (numpy.ndarray): The (r,) singular values.
+    total_variance (float): The sum of the column variances of the data.
+
+    Returns:
+    numpy.ndarray: The (r,) explained variance ratios.
+    """
+    n_samples = U.shape[0]
+    means = U.sum(axis=0) * S / n_samples
+    variances = S ** 2 / n_samples - means ** 2
+    return variances / total_variance
+
+
+def select_rank(ratios: np.ndarray, variance_threshold: float) -> int:
+    """
+    Select the smallest rank explaining the variance threshold.
+
+    Parameters:
+    ratios (numpy.ndarray): The explained variance ratios of the triplets.
+    variance_threshold (float): The fraction of the variance to explain.
+
+    Returns:
+    int: The rank, or the number of triplets if they explain less.
+    """
+    reached = np.flatnonzero(np.cumsum(ratios) >= variance_threshold)
+    return int(reached[0]) + 1 if reached.size else len(ratios)
+
+
+def _orthonormal_basis(Y: np.ndarray, Q: np.ndarray) -> np.ndarray:
+    """
+    Orthonormalize a block against a basis and itself.
+
+    Parameters:
+    Y (numpy.ndarray): The (n, b) block.
+    Q (numpy.ndarray): The (n, k) orthonormal basis.
+
+    Returns:
+    numpy.ndarray: The (n, b) orthonormal block, orthogonal to Q.
+    """
+    # Twice is enough to reach orthogonality in floating point
+    for _ in range(2):
+        Y = Y - Q @ (Q.T @ Y)
+    return np.linalg.qr(Y)[0]
+
+
+def adaptive_randomized_svd(X: np.ndarray,
+                            variance_threshold: float = 0.8,
+                            block_size: int = 10,
+                            n_iter: int = 4,
+                            n_oversamples: int = 5,
+                            max_rank: Optional[int] = None,
+                            random_state: Optional[int] = 0) -> tuple[
+    int,
+    LowRankSpectra,
+    np.ndarray
+                ]:
+    """
+    Compute the truncated SVD explaining the variance threshold, growing a
+    randomized block Krylov subspace until it is reached.
+
+    Every step adds block_size directions, refined by n_iter power
+    iterations against the directions found so far, and stops once the
+    leading triplets of the subspace explain the threshold with
+    n_oversamples triplets to spare. The data is only accessed through
+    products, so it can be memory-mapped or low-rank.
+
+    Parameters:
+    X (numpy.ndarray | LowRankSpectra): The (n_samples, n_features) data.
+    variance_threshold (float): The fraction of the variance to explain.
+    block_size (int): The number of directions added per step.
+    n_iter (int): The number of power iterations of every block.
+    n_oversamples (int): The number of spare triplets computed beyond the
+    selected rank, which make the leading ones accurate.
+    max_rank (int, optional): The largest subspace, defaults to
+    min(n_samples, n_features).
+    random_state (int, optional): Seed of the random blocks.
+
+    Returns:
+    tuple: Containing
+                the selected rank,
+                the denoised spectra of that rank,
+                and the explained variance ratios of all computed triplets.
+    """
+    rng = np.random.default_rng(random_state)
+    n_samples, n_features = X.shape
+    if max_rank is None:
+        max_rank = min(n_samples, n_features)
+    total_variance = _total_variance(X)
+
+    Q = np.zeros((n_samples, 0))
+    while True:
+        size = min(block_size, max_rank - Q.shape[1])
+        Y = _orthonormal_basis(X @ rng.standard_normal((n_features, size)),
+                               Q)
+        for _ in range(n_iter):
+            Z = X.T @ Y
+            Y = _orthonormal_basis(X @ Z, Q)
+        Q = np.hstack((Q, Y))
+
+        # SVD of the data projected on the subspace
+        B = np.asarray(Q.T @ X)
+        U_B, S, Vt = np.linalg.svd(B, full_matrices=False)
+        U = Q @ U_B
+        ratios = explained_variance_ratio(U, S, total_variance)
+        rank = select_rank(ratios, variance_threshold)
+
+        if rank + n_oversamples <= Q.shape[1] or Q.shape[1] >= max_rank:
+            break
+
+    return rank, LowRankSpectra(U[:, :rank], S[:rank], Vt[:rank]), ratios
+
+
+def _row_chunks(X: np.ndarray, chunk_rows: int) -> Iterator[np.ndarray]:
+    """
+    Read the data in chunks of rows.
+
+    Parameters:
+    X (numpy.ndarray | LowRankSpectra): The data, possibly memory-mapped.
+    chunk_rows (int): The number of rows of every chunk.
+
+    Yields:
+    numpy.ndarray: The chunks, as float64 arrays.
+    """
+    for start in range(0, X.shape[0], chunk_rows):
+        yield np.asarray(X[start:start + chunk_rows], dtype=np.float64)
+
+
+def incremental_svd(X: np.ndarray, variance_threshold: float = 0.8,
+                    max_rank: int = 50,
+                    chunk_rows: int = 4096) -> tuple[
+    int,
+    LowRankSpectra,
+    np.ndarray
+                ]:
+    """
+    Compute the truncated SVD explaining the variance threshold in one pass
+    over chunks of rows.
+
+    The SVD of the rows read so far, truncated to max_rank triplets, is
+    updated with every chunk from the SVD of the small matrix stacking
+    diag(S) Vt over the chunk. Only one chunk and the factors are held in
+    memory, so the data can be a memory-mapped .npy file larger than memory.
+
+    Parameters:
+    X (numpy.ndarray | LowRankSpectra): The (n_samples, n_features) data.
+    variance_threshold (float): The fraction of the variance to explain.
+    max_rank (int): The number of triplets kept between chunks; the rank is
+    selected among them.
+    chunk_rows (int): The number of rows of every chunk.
+
+    Returns:
+    tuple: As returned by adaptive_randomized_svd.
+    """
+    n_samples, n_features = X.shape
+    U = np.zeros((0, 0))
+    S = np.zeros(0)
+    Vt = np.zeros((0, n_features))
+    sums = np.zeros(n_features)
+    squares = 0.0
+
+    for chunk in _row_chunks(X, chunk_rows):
+        sums += chunk.sum(axis=0)
+        squares += np.einsum('ij,ij->', chunk, chunk)
+
+        stacked = np.vstack((S[:, None] * Vt, chunk))
+        U_stacked, S, Vt = np.linalg.svd(stacked, full_matrices=False)
+        rank = min(max_rank, len(S))
+        U_stacked, S, Vt = U_stacked[:, :rank], S[:rank], Vt[:rank]
+
+        # [[U, 0], [0, I]] @ U_stacked, without building the block matrix
+        n_previous = U.shape[1]
+        U = np.vstack((U @ U_stacked[:n_previous],
+                       U_stacked[n_previous:]))
+
+    total_variance = float(squares / n_samples
+                           - (sums / n_samples) @ (sums / n_samples))
+    ratios = explained_variance_ratio(U, S, total_variance)
+    rank = select_rank(ratios, variance_threshold)
+    return rank, LowRankSpectra(U[:, :rank], S[:rank], Vt[:rank]), ratios
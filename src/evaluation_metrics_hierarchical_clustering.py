@@ -5,19 +5,97 @@ using various clustering metrics. It includes the following functionalities:
 1. Compute clustering metrics such as WCSS, silhouette scores,
    Calinski-Harabasz scores, and Davies-Bouldin scores for different
    numbers of clusters.
-2. Plot evaluation curves for calculated clustering metrics.
+2. Compute the metrics for many numbers of clusters in parallel worker
+   processes sharing the data through shared memory.
+3. Build the k-nearest neighbors connectivity graph of the ward tree with
+   a tree index on a reduced projection of the data.
+4. Compute the metrics on a cached truncated SVD projection of the data
+   and report how they differ from the full-dimension metrics.
+5. Cache the metrics of every number of clusters on disk, so repeated
+   sweeps only compute the missing ones.
+6. Collect the metrics in a DataFrame without plotting them.
+7. Plot evaluation curves for calculated clustering metrics.
+
+pandas, scipy, scikit-learn and matplotlib are imported by the functions
+using them when they are first called, so importing the module is cheap.
 
 """
 
-import matplotlib.pyplot as plt
-import matplotlib.gridspec as gridspec
+from __future__ import annotations
+
+import hashlib
+import inspect
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from typing import TYPE_CHECKING, Callable, Optional, Union
+
 import numpy as np
-import pandas as pd
-from sklearn.metrics import (silhouette_score, davies_bouldin_score,
-                             calinski_harabasz_score)
-from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import AgglomerativeClustering
-from sklearn.neighbors import kneighbors_graph
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from scipy import sparse
+
+from .results_cache import cache_key, load_scores, store_scores
+from .shared_arrays import (attach_shared_array, create_shared_array,
+                            effective_n_jobs, share_array)
+
+
+def _cluster_statistics(X: np.ndarray, labels: np.ndarray) -> tuple[
+    np.ndarray,
+    np.ndarray,
+    np.ndarray
+                ]:
+    """
+    Compute the size, the sum of the points and the sum of the squared
+    norms of the points of every cluster in a single pass over the data.
+
+    Parameters:
+    X (numpy.ndarray): Standardized data points.
+    labels (numpy.ndarray): Cluster labels for the data points.
+
+    Returns:
+    tuple: Containing arrays of
+                cluster sizes (n_clusters,),
+                cluster sums (n_clusters, n_features),
+                and cluster sums of squares (n_clusters,),
+           ordered as np.unique(labels).
+    """
+    from scipy import sparse
+
+    X = np.asarray(X, dtype=np.float64)
+    _, inverse = np.unique(labels, return_inverse=True)
+    n_clusters = inverse.max() + 1
+    n_samples = X.shape[0]
+
+    counts = np.bincount(inverse, minlength=n_clusters)
+    # Sparse one-hot indicator, so the per-cluster sums are one product
+    # without copying the points of any cluster
+    indicator = sparse.csr_matrix(
+        (np.ones(n_samples), (inverse, np.arange(n_samples))),
+        shape=(n_clusters, n_samples))
+    sums = np.asarray(indicator @ X)
+    squares = np.bincount(inverse, weights=np.einsum('ij,ij->i', X, X),
+                          minlength=n_clusters)
+    return counts, sums, squares
+
+
+def calculate_wcss_per_cluster(X: np.ndarray,
+                               labels: np.ndarray) -> np.ndarray:
+    """
+    Calculate the Within-Cluster Sum of Squares (WCSS) contribution of
+    every cluster for the given data and labels.
+
+    Parameters:
+    X (numpy.ndarray): Standardized data points.
+    labels (numpy.ndarray): Cluster labels for the data points.
+
+    Returns:
+    numpy.ndarray: The WCSS of every cluster, ordered as np.unique(labels).
+    """
+    counts, sums, squares = _cluster_statistics(X, labels)
+    wcss = squares - np.einsum('ij,ij->i', sums, sums) / counts
+    return np.maximum(wcss, 0)
 
 
 def calculate_wcss(X: np.ndarray, labels: np.ndarray) -> float:
@@ -32,15 +110,551 @@ def calculate_wcss(X: np.ndarray, labels: np.ndarray) -> float:
     Returns:
     float: The WCSS value.
     """
-    wcss = 0
-    for label in np.unique(labels):
-        cluster_points = X[labels == label]
-        centroid = cluster_points.mean(axis=0)
-        wcss += ((cluster_points - centroid) ** 2).sum()
-    return wcss
+    return float(calculate_wcss_per_cluster(X, labels).sum())
+
+
+def cut_tree(children: np.ndarray, n_leaves: int,
+             n_clusters: int) -> np.ndarray:
+    """
+    Cut a hierarchical clustering merge tree into the given number of
+    clusters.
+
+    The labels describe the same partition as AgglomerativeClustering
+    fitted with the same data, linkage and n_clusters.
+
+    Parameters:
+    children (numpy.ndarray): The merges of the tree as returned by
+    sklearn.cluster.ward_tree, shape (n_leaves - 1, 2).
+    n_leaves (int): The number of data points.
+    n_clusters (int): The number of clusters to cut the tree into.
+
+    Returns:
+    numpy.ndarray: The cluster labels for the data points.
+    """
+    if not 1 <= n_clusters <= n_leaves:
+        raise ValueError(f"Cannot cut {n_leaves} points into "
+                         f"{n_clusters} clusters")
+
+    # Apply the first n_leaves - n_clusters merges: every merged node points
+    # to the node created by its merge
+    n_merges = n_leaves - n_clusters
+    parents = np.arange(n_leaves + n_merges)
+    parents[children[:n_merges].ravel()] = np.repeat(
+        n_leaves + np.arange(n_merges), 2)
+
+    # Follow the pointers to the roots by repeated doubling
+    roots = parents
+    while True:
+        next_roots = roots[roots]
+        if np.array_equal(next_roots, roots):
+            break
+        roots = next_roots
+
+    _, labels = np.unique(roots[:n_leaves], return_inverse=True)
+    return labels
+
+
+def pairwise_distance_matrix(X: np.ndarray,
+                             file_path: Optional[str] = None,
+                             dtype: type = np.float32,
+                             out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Compute the Euclidean distances between all data points once, so they
+    can be shared by the scores of every number of clusters.
+
+    The distances are computed in row blocks bounded by sklearn's
+    working_memory and written into a square matrix, which is kept in memory
+    or, for datasets whose matrix does not fit, in a memory-mapped .npy file.
+
+    Parameters:
+    X (numpy.ndarray): Standardized data points.
+    file_path (str, optional): If given, store the matrix in this .npy file
+    instead of in memory.
+    dtype (type): The floating point type of the distances.
+    out (numpy.ndarray, optional): If given, the (n_samples, n_samples)
+    array to write the distances into, e.g. one in shared memory.
+
+    Returns:
+    numpy.ndarray: The (n_samples, n_samples) distance matrix.
+    """
+    from sklearn.metrics import pairwise_distances_chunked
+
+    n_samples = X.shape[0]
+    if out is not None:
+        distances = out
+    elif file_path is None:
+        distances = np.empty((n_samples, n_samples), dtype=dtype)
+    else:
+        distances = np.lib.format.open_memmap(
+            file_path, mode='w+', dtype=dtype, shape=(n_samples, n_samples))
+
+    start = 0
+    for block in pairwise_distances_chunked(X):
+        distances[start:start + block.shape[0]] = block
+        start += block.shape[0]
+    return distances
+
+
+# Projections computed by project_onto_components, most recent last
+_projection_cache = OrderedDict()
+_PROJECTION_CACHE_SIZE = 4
+
+
+def project_onto_components(X: np.ndarray, n_components: int,
+                            random_state: Optional[int] = 0) -> np.ndarray:
+    """
+    Project the points onto their top singular directions.
+
+    The projections are cached by the content of the data, so repeated
+    sweeps over the same spectra compute the SVD once.
+
+    Parameters:
+    X (numpy.ndarray): Standardized data points.
+    n_components (int): The number of singular directions to keep.
+    random_state (int, optional): Seed of the randomized SVD.
+
+    Returns:
+    numpy.ndarray: The (n_samples, n_components) projected points. Distances
+    between them approximate the distances between the data points.
+    """
+    from sklearn.decomposition import TruncatedSVD
+
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    key = (hashlib.sha1(X).hexdigest(), X.shape, n_components, random_state)
+    if key in _projection_cache:
+        _projection_cache.move_to_end(key)
+        return _projection_cache[key]
+
+    svd = TruncatedSVD(n_components=n_components, random_state=random_state)
+    projection = svd.fit_transform(X)
+    projection.setflags(write=False)
+    _projection_cache[key] = projection
+    if len(_projection_cache) > _PROJECTION_CACHE_SIZE:
+        _projection_cache.popitem(last=False)
+    return projection
+
+
+def connectivity_graph(X: np.ndarray, n_neighbors: int = 10,
+                       n_components: Optional[int] = 50,
+                       algorithm: str = 'ball_tree',
+                       n_jobs: Optional[int] = None,
+                       random_state: Optional[int] = 0) -> sparse.csr_matrix:
+    """
+    Build the k-nearest neighbors connectivity graph constraining the ward
+    tree.
+
+    Neighbor searches with a tree index degrade to brute force in the full
+    wavenumber space, so the points are first projected onto their top
+    singular directions, which keep the neighborhoods of spectra dominated
+    by a few components, and the index is built on the projection.
+
+    Parameters:
+    X (numpy.ndarray): Standardized data points.
+    n_neighbors (int): The number of neighbors of every point.
+    n_components (int, optional): The dimension of the projection the
+    neighbors are searched in. None, or at least the number of features,
+    searches the data itself.
+    algorithm (str): The sklearn.neighbors.NearestNeighbors algorithm:
+    'ball_tree', 'kd_tree', 'brute' or 'auto'.
+    n_jobs (int, optional): The number of parallel neighbor queries; -1
+    uses all CPUs.
+    random_state (int, optional): Seed of the randomized SVD.
+
+    Returns:
+    scipy.sparse.csr_matrix: The (n_samples, n_samples) connectivity
+    matrix, without self loops.
+    """
+    from sklearn.decomposition import TruncatedSVD
+    from sklearn.neighbors import NearestNeighbors
+
+    n_samples, n_features = X.shape
+    if (n_components is not None
+            and n_components < min(n_samples, n_features)):
+        # Standardized data is centered, so this is a PCA projection
+        svd = TruncatedSVD(n_components=n_components,
+                           random_state=random_state)
+        X = svd.fit_transform(X)
+
+    neighbors = NearestNeighbors(n_neighbors=n_neighbors,
+                                 algorithm=algorithm, n_jobs=n_jobs)
+    neighbors.fit(X)
+    # Querying the fitted points excludes every point from its neighbors
+    return neighbors.kneighbors_graph(mode='connectivity')
+
+
+def sampled_silhouette_score(X: np.ndarray, labels: np.ndarray,
+                             sample_size: int,
+                             random_state: Optional[int] = None,
+                             metric: str = 'euclidean') -> float:
+    """
+    Approximate the silhouette score on a subsample stratified by label.
+
+    Every cluster contributes points in proportion to its size, and at least
+    one point, so small clusters such as the nucleation spectra are not
+    dropped from the estimate as they can be with uniform sampling.
+
+    Parameters:
+    X (numpy.ndarray): Standardized data points.
+    labels (numpy.ndarray): Cluster labels for the data points.
+    sample_size (int): The approximate number of points to score.
+    random_state (int, optional): Seed of the subsampling.
+    metric (str): 'euclidean', or 'precomputed' if X is a distance matrix
+    as returned by pairwise_distance_matrix.
+
+    Returns:
+    float: The silhouette score of the subsample.
+    """
+    from sklearn.metrics import silhouette_score
+    from sklearn.utils import check_random_state
+
+    n_samples = len(labels)
+    if sample_size >= n_samples:
+        return silhouette_score(X, labels, metric=metric)
+
+    _, inverse, counts = np.unique(labels, return_inverse=True,
+                                   return_counts=True)
+    quotas = np.clip(np.round(counts * sample_size / n_samples), 1, counts)
+
+    # Shuffle, group the points by label and keep the first quota points of
+    # every group
+    permutation = check_random_state(random_state).permutation(n_samples)
+    grouped = permutation[np.argsort(inverse[permutation], kind='stable')]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    rank = np.arange(n_samples) - starts[inverse[grouped]]
+    sample = np.sort(grouped[rank < quotas[inverse[grouped]]])
+
+    if metric == 'precomputed':
+        X_sample = X[np.ix_(sample, sample)]
+    else:
+        X_sample = np.asarray(X)[sample]
+    return silhouette_score(X_sample, np.asarray(labels)[sample],
+                            metric=metric)
+
+
+def _check_number_of_labels(n_labels: int, n_samples: int) -> None:
+    """
+    Check that a score is defined for the given number of clusters, as
+    sklearn.metrics does.
+
+    Parameters:
+    n_labels (int): The number of clusters.
+    n_samples (int): The number of data points.
+    """
+    if not 1 < n_labels < n_samples:
+        raise ValueError(f"Number of labels is {n_labels}. Valid values are "
+                         "2 to n_samples - 1 (inclusive)")
+
+
+def _tree_order(children: np.ndarray, n_leaves: int,
+                top_nodes: np.ndarray) -> list[int]:
+    """
+    Order the clusters of a tree cut as the leaves of the dendrogram, so
+    every node above the cut covers a contiguous run of clusters.
+
+    Parameters:
+    children (numpy.ndarray): The merges of the tree, as in cut_tree.
+    n_leaves (int): The number of data points.
+    top_nodes (numpy.ndarray): The node ids of the clusters of the cut.
+
+    Returns:
+    list: The node ids of the clusters in dendrogram order.
+    """
+    n_top_merges = len(top_nodes) - 1
+    first_top_node = 2 * n_leaves - 1 - n_top_merges
+
+    order = []
+    stack = [2 * n_leaves - 2]
+    while stack:
+        node = stack.pop()
+        if node >= first_top_node:
+            left, right = children[node - n_leaves]
+            stack.extend((right, left))
+        else:
+            order.append(node)
+    return order
+
+
+def tree_cut_statistics(X: np.ndarray, children: np.ndarray, n_leaves: int,
+                        cluster_number: range) -> dict[int, tuple[
+                            np.ndarray,
+                            np.ndarray,
+                            np.ndarray,
+                            np.ndarray
+                        ]]:
+    """
+    Compute the per-cluster statistics of every cut of a merge tree by
+    walking the merges above the finest cut.
+
+    The points are reordered once so every cluster is a contiguous block.
+    Sizes, centroids and scatters of the finest clusters are computed from
+    their blocks; merged clusters combine those of their children, and only
+    the mean distance of the points to the centroid, which cannot be
+    combined, is recomputed from the block of a newly merged cluster.
+
+    Parameters:
+    X (numpy.ndarray): Standardized data points.
+    children (numpy.ndarray): The merges of the tree, as in cut_tree.
+    n_leaves (int): The number of data points.
+    cluster_number (range): The cluster numbers to compute statistics for.
+
+    Returns:
+    dict: Mapping every cluster number to arrays of
+                cluster sizes,
+                cluster centroids,
+                cluster scatters (sum of squared distances to the centroid),
+                and mean distances of the points to their centroid.
+    """
+    from sklearn.metrics import pairwise_distances
+
+    X = np.asarray(X, dtype=np.float64)
+    cluster_number = sorted(set(cluster_number))
+    max_clusters = cluster_number[-1]
+    min_clusters = cluster_number[0]
+    finest_labels = cut_tree(children, n_leaves, max_clusters)
+
+    # Node ids of the finest clusters: the labels of cut_tree enumerate the
+    # roots in increasing node id order
+    n_merges = n_leaves - max_clusters
+    merged = np.zeros(n_leaves + n_merges, dtype=bool)
+    merged[children[:n_merges].ravel()] = True
+    top_nodes = np.flatnonzero(~merged)
+
+    order = _tree_order(children, n_leaves, top_nodes)
+    position = np.empty(len(top_nodes), dtype=np.intp)
+    position[np.searchsorted(top_nodes, order)] = np.arange(len(order))
+    point_order = np.argsort(position[finest_labels], kind='stable')
+    X_sorted = X[point_order]
+
+    counts = np.bincount(finest_labels, minlength=len(top_nodes))
+    stops = np.cumsum(counts[np.searchsorted(top_nodes, order)])
+    blocks = {node: (stop - size, stop) for node, size, stop
+              in zip(order, counts[np.searchsorted(top_nodes, order)], stops)}
+
+    sizes = {}
+    centroids = {}
+    scatters = {}
+    intra_distances = {}
+
+    def compute_block_statistics(node: int, with_scatter: bool) -> None:
+        start, stop = blocks[node]
+        block = X_sorted[start:stop]
+        centroid = block.mean(axis=0)
+        if with_scatter:
+            sizes[node] = stop - start
+            centroids[node] = centroid
+            scatters[node] = ((block - centroid) ** 2).sum()
+        # Same distance computation as sklearn's Davies-Bouldin score
+        intra_distances[node] = np.average(
+            pairwise_distances(block, [centroid]))
 
+    for node in order:
+        compute_block_statistics(node, with_scatter=True)
 
-def compute_metrics(dataframe: pd.DataFrame, cluster_number: range) -> tuple[
+    def collect(active: list[int]) -> tuple[np.ndarray, np.ndarray,
+                                            np.ndarray, np.ndarray]:
+        for node in active:
+            if node not in intra_distances:
+                compute_block_statistics(node, with_scatter=False)
+        return (np.array([sizes[node] for node in active]),
+                np.array([centroids[node] for node in active]),
+                np.array([scatters[node] for node in active]),
+                np.array([intra_distances[node] for node in active]))
+
+    statistics = {}
+    active = list(order)
+    if max_clusters in cluster_number:
+        statistics[max_clusters] = collect(active)
+
+    for merge in range(n_merges, n_leaves - min_clusters):
+        left, right = children[merge]
+        node = n_leaves + merge
+        n_left, n_right = sizes[left], sizes[right]
+        difference = centroids[left] - centroids[right]
+
+        sizes[node] = n_left + n_right
+        centroids[node] = (n_left * centroids[left]
+                           + n_right * centroids[right]) / sizes[node]
+        scatters[node] = (scatters[left] + scatters[right]
+                          + n_left * n_right / sizes[node]
+                          * difference @ difference)
+        blocks[node] = (min(blocks[left][0], blocks[right][0]),
+                        max(blocks[left][1], blocks[right][1]))
+
+        index = active.index(left)
+        active[index] = node
+        active.remove(right)
+
+        n_clusters = n_leaves - merge - 1
+        if n_clusters in cluster_number:
+            statistics[n_clusters] = collect(active)
+
+    return statistics
+
+
+def _calinski_harabasz_from_statistics(statistics: tuple,
+                                       n_samples: int) -> float:
+    """
+    Calculate the Calinski-Harabasz score from per-cluster statistics.
+
+    Parameters:
+    statistics (tuple): The cluster statistics of tree_cut_statistics.
+    n_samples (int): The number of data points.
+
+    Returns:
+    float: The Calinski-Harabasz score.
+    """
+    sizes, centroids, scatters, _ = statistics
+    n_labels = len(sizes)
+    _check_number_of_labels(n_labels, n_samples)
+
+    mean = sizes @ centroids / n_samples
+    extra_disp = sizes @ ((centroids - mean) ** 2).sum(axis=1)
+    intra_disp = scatters.sum()
+    if intra_disp == 0.0:
+        return 1.0
+    return float(extra_disp * (n_samples - n_labels)
+                 / (intra_disp * (n_labels - 1.0)))
+
+
+def _davies_bouldin_from_statistics(statistics: tuple,
+                                    n_samples: int) -> float:
+    """
+    Calculate the Davies-Bouldin score from per-cluster statistics.
+
+    Parameters:
+    statistics (tuple): The cluster statistics of tree_cut_statistics.
+    n_samples (int): The number of data points.
+
+    Returns:
+    float: The Davies-Bouldin score.
+    """
+    from sklearn.metrics import pairwise_distances
+
+    _, centroids, _, intra_distances = statistics
+    _check_number_of_labels(len(centroids), n_samples)
+
+    centroid_distances = pairwise_distances(centroids)
+    if (np.allclose(intra_distances, 0)
+            or np.allclose(centroid_distances, 0)):
+        return 0.0
+    centroid_distances[centroid_distances == 0] = np.inf
+    combined_intra_distances = intra_distances[:, None] + intra_distances
+    scores = np.max(combined_intra_distances / centroid_distances, axis=1)
+    return float(np.mean(scores))
+
+
+def _label_scorers(X: np.ndarray, silhouette_input: np.ndarray,
+                   silhouette_metric: str,
+                   silhouette_sample_size: Optional[int],
+                   random_state: Optional[int]) -> dict[
+                       str, Callable[[int, np.ndarray], float]]:
+    """
+    Build the scorers of a number of clusters and its labels, in reporting
+    order.
+
+    Parameters:
+    X (numpy.ndarray): Standardized data points.
+    silhouette_input (numpy.ndarray): The data points, or their distance
+    matrix if silhouette_metric is 'precomputed'.
+    silhouette_metric (str): 'euclidean' or 'precomputed'.
+    silhouette_sample_size (int, optional): If given, approximate the
+    silhouette score on a label-stratified subsample of this size.
+    random_state (int, optional): Seed of the silhouette subsampling.
+
+    Returns:
+    dict: Mapping the metric names to functions of the number of clusters
+    and the labels.
+    """
+    from sklearn.metrics import (silhouette_score, davies_bouldin_score,
+                                 calinski_harabasz_score)
+
+    if silhouette_sample_size is None:
+        def silhouette(i, labels):
+            return silhouette_score(silhouette_input, labels,
+                                    metric=silhouette_metric)
+    else:
+        def silhouette(i, labels):
+            return sampled_silhouette_score(
+                silhouette_input, labels, silhouette_sample_size,
+                random_state, silhouette_metric)
+
+    return {
+        'WCSS': lambda i, labels: calculate_wcss(X, labels),
+        'Davies-Bouldin': lambda i, labels: davies_bouldin_score(X, labels),
+        'Silhouette': silhouette,
+        'Calinski-Harabasz': lambda i, labels: calinski_harabasz_score(
+            X, labels),
+    }
+
+
+# State of a metric worker process, set by _init_metric_worker
+_worker_state = {}
+
+
+def _init_metric_worker(data_descriptor: tuple,
+                        silhouette_source: Optional[Union[tuple, str]],
+                        silhouette_metric: str,
+                        children: np.ndarray, n_leaves: int,
+                        silhouette_sample_size: Optional[int],
+                        random_state: Optional[int]) -> None:
+    """
+    Attach a worker process to the shared standardized data (and distance
+    matrix) and build its scorers.
+
+    Parameters:
+    data_descriptor (tuple): The shared array descriptor of the data.
+    silhouette_source (tuple | str, optional): None to score silhouettes on
+    the data, the shared array descriptor of the distance matrix, or the
+    path of its .npy file.
+    silhouette_metric (str): 'euclidean' or 'precomputed'.
+    children (numpy.ndarray): The merges of the tree, as in cut_tree.
+    n_leaves (int): The number of data points.
+    silhouette_sample_size (int, optional): As in compute_metrics.
+    random_state (int, optional): As in compute_metrics.
+    """
+    blocks = []
+    block, X = attach_shared_array(data_descriptor)
+    blocks.append(block)
+    if silhouette_source is None:
+        silhouette_input = X
+    elif isinstance(silhouette_source, str):
+        silhouette_input = np.load(silhouette_source, mmap_mode='r')
+    else:
+        block, silhouette_input = attach_shared_array(silhouette_source)
+        blocks.append(block)
+
+    _worker_state.update(
+        blocks=blocks, children=children, n_leaves=n_leaves,
+        scorers=_label_scorers(X, silhouette_input, silhouette_metric,
+                               silhouette_sample_size, random_state))
+
+
+def _score_in_worker(name: str, i: int) -> float:
+    """
+    Score one number of clusters with one metric in a worker process.
+
+    Parameters:
+    name (str): The name of the metric.
+    i (int): The number of clusters.
+
+    Returns:
+    float: The score.
+    """
+    labels = cut_tree(_worker_state['children'], _worker_state['n_leaves'], i)
+    return _worker_state['scorers'][name](i, labels)
+
+
+def compute_metrics(dataframe: pd.DataFrame, cluster_number: range,
+                    incremental: bool = False,
+                    silhouette_sample_size: Optional[int] = None,
+                    random_state: Optional[int] = 0,
+                    precompute_distances: bool = False,
+                    distance_file: Optional[str] = None,
+                    n_jobs: Optional[int] = None,
+                    n_neighbors: int = 10,
+                    connectivity_components: Optional[int] = 50,
+                    connectivity_algorithm: str = 'ball_tree',
+                    svd_components: Optional[int] = None) -> tuple[
     list[float],
     list[float],
     list[float],
@@ -52,6 +666,32 @@ def compute_metrics(dataframe: pd.DataFrame, cluster_number: range) -> tuple[
     Parameters:
     dataframe (pandas.DataFrame): The input data.
     cluster_number (range): The range of cluster numbers to evaluate.
+    incremental (bool): Derive WCSS, Calinski-Harabasz and Davies-Bouldin
+    scores from cluster statistics updated along the merge tree instead of
+    scoring every number of clusters over all points.
+    silhouette_sample_size (int, optional): If given, approximate the
+    silhouette score on a label-stratified subsample of this size.
+    random_state (int, optional): Seed of the silhouette subsampling.
+    precompute_distances (bool): Compute the pairwise distances of the
+    standardized data once and share them between the silhouette scores of
+    all cluster numbers.
+    distance_file (str, optional): Keep the shared distances in this
+    memory-mapped .npy file instead of in memory; implies
+    precompute_distances.
+    n_jobs (int, optional): The number of processes scoring different
+    cluster numbers and metrics concurrently; -1 uses all CPUs. The
+    standardized data and distances are shared with the workers through
+    shared memory.
+    n_neighbors (int): The number of neighbors of every point in the
+    connectivity graph of the ward tree.
+    connectivity_components (int, optional): The dimension of the
+    projection of the standardized data the neighbors are searched in; None
+    searches the standardized data itself.
+    connectivity_algorithm (str): The neighbor search algorithm, as in
+    connectivity_graph.
+    svd_components (int, optional): If given, project the standardized data
+    onto this many singular directions once and build the tree and compute
+    every metric in the projected space.
 
     Returns:
     tuple: Containing lists of
@@ -60,89 +700,257 @@ def compute_metrics(dataframe: pd.DataFrame, cluster_number: range) -> tuple[
                 Calinski-Harabasz scores,
                 and Davies-Bouldin scores.
     """
-    knn_graph = kneighbors_graph(dataframe, 10, include_self=False)
-
-    wcss = []
-    silhouette_scores = []
-    calinski_harabasz_scores = []
-    davies_bouldin_scores = []
-
-    scaler = StandardScaler()
-    dataframe_standardized = scaler.fit_transform(dataframe)
-
-    for i in cluster_number:
-        clustering = AgglomerativeClustering(
-            n_clusters=i, metric='euclidean', linkage='ward',
-            connectivity=knn_graph)
-        clustering.fit_predict(dataframe_standardized)
-
-        try:
-            wcss.append(calculate_wcss(dataframe_standardized,
-                                       clustering.labels_))
-        except Exception:
-            print(f"WCSS score omitted for point {i}")
-            wcss.append(np.nan)
-
-        try:
-            davies_bouldin = davies_bouldin_score(dataframe_standardized,
-                                                  clustering.labels_)
-            davies_bouldin_scores.append(davies_bouldin)
-        except Exception:
-            print(f"Davies-Bouldin score omitted for point {i}")
-            davies_bouldin_scores.append(np.nan)
-
-        try:
-            silhouette_avg = silhouette_score(dataframe_standardized,
-                                              clustering.labels_)
-            silhouette_scores.append(silhouette_avg)
-        except Exception:
-            print(f"Silhouette score omitted for point {i}")
-            silhouette_scores.append(np.nan)
-
-        try:
-            calinski_harabasz = calinski_harabasz_score(dataframe_standardized,
-                                                        clustering.labels_)
-            calinski_harabasz_scores.append(calinski_harabasz)
-        except Exception:
-            print(f"Calinski-Harabasz score omitted for point {i}")
-            calinski_harabasz_scores.append(np.nan)
-
-    return (wcss, silhouette_scores, calinski_harabasz_scores,
-            davies_bouldin_scores)
+    from sklearn.cluster import ward_tree
+    from sklearn.preprocessing import StandardScaler
 
+    n_jobs = effective_n_jobs(n_jobs)
 
-def plot_hierarchical_clustering_evaluation_curves(
+    with ExitStack() as stack:
+        scaler = StandardScaler()
+        dataframe_standardized = scaler.fit_transform(dataframe)
+        if svd_components is not None:
+            dataframe_standardized = project_onto_components(
+                dataframe_standardized, svd_components, random_state)
+        n_samples = dataframe_standardized.shape[0]
+        if n_jobs > 1:
+            block, dataframe_standardized, data_descriptor = share_array(
+                dataframe_standardized)
+            stack.callback(block.unlink)
+            stack.callback(block.close)
+
+        knn_graph = connectivity_graph(
+            dataframe_standardized, n_neighbors, connectivity_components,
+            connectivity_algorithm, n_jobs, random_state)
+
+        # Build the full ward merge tree once; every number of clusters is a
+        # cut of the same tree
+        children, _, n_leaves, _ = ward_tree(dataframe_standardized,
+                                             connectivity=knn_graph)
+
+        # Silhouette input: the points, or their distances computed once
+        silhouette_source = None
+        silhouette_input = dataframe_standardized
+        silhouette_metric = 'euclidean'
+        if precompute_distances or distance_file is not None:
+            silhouette_metric = 'precomputed'
+            out = None
+            if distance_file is not None:
+                silhouette_source = distance_file
+            elif n_jobs > 1:
+                block, out, silhouette_source = create_shared_array(
+                    (n_samples, n_samples), np.float32)
+                stack.callback(block.unlink)
+                stack.callback(block.close)
+            silhouette_input = pairwise_distance_matrix(
+                dataframe_standardized, distance_file, out=out)
+
+        scorers = _label_scorers(dataframe_standardized, silhouette_input,
+                                 silhouette_metric, silhouette_sample_size,
+                                 random_state)
+        if incremental:
+            statistics = tree_cut_statistics(dataframe_standardized,
+                                             children, n_leaves,
+                                             cluster_number)
+            scorers['WCSS'] = lambda i, labels: float(
+                statistics[i][2].sum())
+            scorers['Davies-Bouldin'] = (
+                lambda i, labels: _davies_bouldin_from_statistics(
+                    statistics[i], n_samples))
+            scorers['Calinski-Harabasz'] = (
+                lambda i, labels: _calinski_harabasz_from_statistics(
+                    statistics[i], n_samples))
+
+        # Scores computed by the worker processes; the incremental scores
+        # only read the precomputed statistics and stay in this process
+        futures = {}
+        if n_jobs > 1:
+            executor = stack.enter_context(ProcessPoolExecutor(
+                max_workers=n_jobs, initializer=_init_metric_worker,
+                initargs=(data_descriptor, silhouette_source,
+                          silhouette_metric, children, n_leaves,
+                          silhouette_sample_size, random_state)))
+            remote = (['Silhouette'] if incremental
+                      else list(scorers))
+            futures = {(name, i): executor.submit(_score_in_worker, name, i)
+                       for i in cluster_number for name in remote}
+
+        scores = {name: [] for name in scorers}
+        for i in cluster_number:
+            labels = cut_tree(children, n_leaves, i)
+
+            for name, scorer in scorers.items():
+                try:
+                    if (name, i) in futures:
+                        scores[name].append(futures[name, i].result())
+                    else:
+                        scores[name].append(scorer(i, labels))
+                except Exception:
+                    print(f"{name} score omitted for point {i}")
+                    scores[name].append(np.nan)
+
+    return (scores['WCSS'], scores['Silhouette'],
+            scores['Calinski-Harabasz'], scores['Davies-Bouldin'])
+
+
+def cached_compute_metrics(dataframe: pd.DataFrame, cluster_number: range,
+                           cache_dir: str,
+                           max_cache_bytes: Optional[int] = 64 * 2**20,
+                           **kwargs) -> tuple[
+    list[float],
+    list[float],
+    list[float],
+    list[float]
+                ]:
+    """
+    Compute clustering metrics as compute_metrics, reusing the scores of
+    the numbers of clusters already cached for the same data and settings.
+
+    Only the missing numbers of clusters are computed, and added to the
+    cache entry, so re-plotting or widening the range is cheap.
+
+    Parameters:
+    dataframe (pandas.DataFrame): The input data.
+    cluster_number (range): The range of cluster numbers to evaluate.
+    cache_dir (str): The directory of the cache.
+    max_cache_bytes (int, optional): The size bound of the cache directory;
+    the least recently used entries beyond it are deleted.
+    **kwargs: Further arguments of compute_metrics.
+
+    Returns:
+    tuple: As returned by compute_metrics.
+    """
+    arguments = inspect.signature(compute_metrics).bind_partial(**kwargs)
+    arguments.apply_defaults()
+    settings = dict(arguments.arguments)
+    # Neither changes the scores: the worker count, and where the distances
+    # are kept once they are precomputed
+    settings.pop('n_jobs')
+    if settings.pop('distance_file') is not None:
+        settings['precompute_distances'] = True
+
+    key = cache_key(dataframe.to_numpy(), settings)
+    scores = load_scores(cache_dir, key)
+    missing = [i for i in cluster_number if i not in scores]
+    if missing:
+        computed = compute_metrics(dataframe, missing, **kwargs)
+        for i, values in zip(missing, zip(*computed)):
+            scores[i] = [float(value) for value in values]
+        store_scores(cache_dir, key, scores, max_cache_bytes)
+
+    wcss, silhouette, calinski_harabasz, davies_bouldin = (
+        list(metric) for metric in zip(*(scores[i] for i in cluster_number)))
+    return wcss, silhouette, calinski_harabasz, davies_bouldin
+
+
+def compare_projected_metrics(dataframe: pd.DataFrame,
+                              cluster_number: range,
+                              svd_components: int,
+                              **kwargs) -> pd.DataFrame:
+    """
+    Report how the metrics computed on a truncated SVD projection differ
+    from the metrics computed on all features.
+
+    Parameters:
+    dataframe (pandas.DataFrame): The input data.
+    cluster_number (range): The range of cluster numbers to evaluate.
+    svd_components (int): The number of singular directions projected on.
+    **kwargs: Further arguments of compute_metrics, used by both sweeps.
+
+    Returns:
+    pandas.DataFrame: Indexed by the number of clusters, with the full,
+    projected and relative difference ((projected - full) / |full|) value
+    of every metric.
+    """
+    import pandas as pd
+
+    names = ['WCSS', 'Silhouette', 'Calinski-Harabasz', 'Davies-Bouldin']
+    full = compute_metrics(dataframe, cluster_number, **kwargs)
+    projected = compute_metrics(dataframe, cluster_number,
+                                svd_components=svd_components, **kwargs)
+
+    columns = {}
+    for name, full_scores, projected_scores in zip(names, full, projected):
+        full_scores = np.asarray(full_scores, dtype=np.float64)
+        projected_scores = np.asarray(projected_scores, dtype=np.float64)
+        columns[(name, 'full')] = full_scores
+        columns[(name, 'projected')] = projected_scores
+        with np.errstate(divide='ignore', invalid='ignore'):
+            columns[(name, 'relative difference')] = (
+                (projected_scores - full_scores) / np.abs(full_scores))
+
+    report = pd.DataFrame(columns, index=list(cluster_number))
+    report.index.name = 'Number of Clusters'
+    return report
+
+
+def evaluate_hierarchical_clustering(
         dataframe: pd.DataFrame,
-        cluster_number_evaluation: int,
-        cluster_number: range = range(2, 10)) -> None:
+        cluster_number: range = range(2, 10),
+        cache_dir: Optional[str] = None,
+        **kwargs) -> pd.DataFrame:
     """
-    Plot evaluation curves for hierarchical clustering metrics.
+    Compute the hierarchical clustering metrics without plotting them.
 
     Parameters:
     dataframe (pandas.DataFrame): The input data.
-    cluster_number_evaluation (int): The cluster number at which to draw a line
     cluster_number (range): The range of cluster numbers to evaluate.
+    cache_dir (str, optional): If given, reuse and extend the metrics cached
+    in this directory.
+    **kwargs: Further arguments of compute_metrics.
+
+    Returns:
+    pandas.DataFrame: Indexed by the number of clusters, with the 'WCSS',
+    'Silhouette', 'Calinski-Harabasz' and 'Davies-Bouldin' columns.
+    """
+    import pandas as pd
+
+    if cache_dir is None:
+        metrics = compute_metrics(dataframe, cluster_number, **kwargs)
+    else:
+        metrics = cached_compute_metrics(dataframe, cluster_number,
+                                         cache_dir, **kwargs)
+
+    names = ['WCSS', 'Silhouette', 'Calinski-Harabasz', 'Davies-Bouldin']
+    evaluation = pd.DataFrame(dict(zip(names, metrics)),
+                              index=list(cluster_number))
+    evaluation.index.name = 'Number of Clusters'
+    return evaluation
+
+
+def plot_hierarchical_clustering_metrics(
+        evaluation: pd.DataFrame,
+        cluster_number_evaluation: int) -> None:
+    """
+    Plot evaluation curves for computed hierarchical clustering metrics.
+
+    Parameters:
+    evaluation (pandas.DataFrame): The metrics, as returned by
+    evaluate_hierarchical_clustering.
+    cluster_number_evaluation (int): The cluster number at which to draw a line
     """
-    (wcss, silhouette_scores, calinski_harabasz_scores,
-     davies_bouldin_scores) = compute_metrics(dataframe, cluster_number)
+    import matplotlib.pyplot as plt
+    import matplotlib.gridspec as gridspec
+
+    cluster_number = evaluation.index
 
     fig = plt.figure(figsize=(8, 6))
     gs = gridspec.GridSpec(4, 1, height_ratios=[3, 2, 2, 2], hspace=0.08)
 
     ax1 = fig.add_subplot(gs[0])
-    ax1.plot(cluster_number, wcss, label='WCSS', color='red', marker='x')
+    ax1.plot(cluster_number, evaluation['WCSS'], label='WCSS', color='red',
+             marker='x')
     ax1.set_ylabel('WCSS', color='red')
     ax1.axvline(x=cluster_number_evaluation, color='black', linestyle='--')
 
     ax2 = fig.add_subplot(gs[1], sharex=ax1)
-    ax2.plot(cluster_number, silhouette_scores, label='Silhouette',
+    ax2.plot(cluster_number, evaluation['Silhouette'], label='Silhouette',
              color='blue', marker='o')
     ax2.set_ylabel('Silhouette\nScore', color='blue')
     ax2.axvline(x=cluster_number_evaluation, color='black', linestyle='--')
     plt.setp(ax1.get_xticklabels(), visible=False)
 
     ax3 = fig.add_subplot(gs[2], sharex=ax1)
-    ax3.plot(cluster_number, calinski_harabasz_scores,
+    ax3.plot(cluster_number, evaluation['Calinski-Harabasz'],
              label='Calinski-Harabasz',
              color='green', marker='s')
     ax3.set_ylabel('Calinski-Harabasz\nScore', color='green')
@@ -150,7 +958,8 @@ def plot_hierarchical_clustering_evaluation_curves(
     plt.setp(ax2.get_xticklabels(), visible=False)
 
     ax4 = fig.add_subplot(gs[3], sharex=ax1)
-    ax4.plot(cluster_number, davies_bouldin_scores, label='Davies-Bouldin',
+    ax4.plot(cluster_number, evaluation['Davies-Bouldin'],
+             label='Davies-Bouldin',
              color='darkviolet', marker='P')
     ax4.set_ylabel('Davies-Bouldin\nScore', color='darkviolet')
     ax4.axvline(x=cluster_number_evaluation, color='black', linestyle='--')
@@ -158,3 +967,24 @@ def plot_hierarchical_clustering_evaluation_curves(
     plt.setp(ax3.get_xticklabels(), visible=False)
 
     plt.show()
+
+
+def plot_hierarchical_clustering_evaluation_curves(
+        dataframe: pd.DataFrame,
+        cluster_number_evaluation: int,
+        cluster_number: range = range(2, 10),
+        cache_dir: Optional[str] = None) -> None:
+    """
+    Compute and plot evaluation curves for hierarchical clustering metrics.
+
+    Parameters:
+    dataframe (pandas.DataFrame): The input data.
+    cluster_number_evaluation (int): The cluster number at which to draw a line
+    cluster_number (range): The range of cluster numbers to evaluate.
+    cache_dir (str, optional): If given, reuse and extend the metrics cached
+    in this directory.
+    """
+    evaluation = evaluate_hierarchical_clustering(dataframe, cluster_number,
+                                                  cache_dir)
+    plot_hierarchical_clustering_metrics(evaluation,
+                                         cluster_number_evaluation)
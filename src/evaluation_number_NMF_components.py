@@ -5,29 +5,73 @@ components.
 
 It includes the following functionalities:
 
-1. Creating an NMF pipeline with a specified number of components.
-2. Calculating the norms of the residuals for different numbers of components.
-3. Plotting the evaluation curve for the number of NMF components.
-4. Evaluating the NMF model and plotting the evaluation curve.
+1. Creating an NMF pipeline with a specified number of components, with a
+   batch or a mini-batch (online) NMF, and projecting new spectra onto
+   fitted components by batched non-negative least squares.
+2. Calculating the norms of the residuals for different numbers of components,
+   optionally warm-starting every fit from the previous one or fitting the
+   component numbers in parallel worker processes sharing the data, with
+   any solver registered in nmf_solvers.
+3. Fitting a mini-batch NMF by streaming row chunks of data too large for
+   memory, e.g. a memory-mapped .npy file.
+4. Fitting a compressed NMF on the SVD factors of the data, without
+   materializing the data.
+5. Collecting the norms of the residuals in a DataFrame without plotting.
+6. Plotting the evaluation curve for the number of NMF components.
+7. Evaluating the NMF model and plotting the evaluation curve.
+
+pandas, scikit-learn and matplotlib are imported by the functions using them
+when they are first called, so importing the module is cheap.
 
 """
 
+from __future__ import annotations
+
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from typing import TYPE_CHECKING, Optional
+
 import numpy as np
-import matplotlib.pyplot as plt
-from sklearn.decomposition import NMF
-from sklearn.pipeline import Pipeline
 
+from .low_rank_spectra import LowRankSpectra
+from .nmf_solvers import (FACTORED_SOLVERS, WARM_START_SOLVERS, fit_nmf,
+                          nndsvd_components, nnls_block_principal_pivoting)
+from .shared_arrays import attach_shared_array, effective_n_jobs, share_array
 
-def create_pipeline(n_components: int) -> Pipeline:
+if TYPE_CHECKING:
+    import pandas as pd
+    from sklearn.pipeline import Pipeline
+
+
+def create_pipeline(n_components: int,
+                    batch_size: Optional[int] = None) -> Pipeline:
     """
     Create an NMF pipeline with the specified number of components.
 
     Parameters:
     n_components (int): Number of components for NMF.
+    batch_size (int, optional): If given, use a MiniBatchNMF updating the
+    components with batches of this many rows instead of the batch NMF.
 
     Returns:
     sklearn.pipeline.Pipeline: The NMF pipeline.
     """
+    from sklearn.decomposition import NMF, MiniBatchNMF
+    from sklearn.pipeline import Pipeline
+
+    if batch_size is not None:
+        return Pipeline([
+            ('nmf', MiniBatchNMF(
+                n_components=n_components,
+                init='nndsvda',
+                batch_size=batch_size,
+                beta_loss='frobenius',
+                tol=1e-4,
+                random_state=0,
+                max_iter=200))
+        ])
+
     return Pipeline([
         ('nmf', NMF(
             n_components=n_components,
@@ -41,33 +85,392 @@ def create_pipeline(n_components: int) -> Pipeline:
     ])
 
 
+def nnls_weights(data: np.ndarray, components: np.ndarray,
+                 block_rows: int = 65536) -> np.ndarray:
+    """
+    Calculate the non-negative weights of spectra on fixed NMF components.
+
+    Every row w of the result minimizes ||x - w H|| with w >= 0, as
+    NMF.transform with fixed components_ does, but the problems are solved
+    exactly and all together by nnls_block_principal_pivoting, sharing the
+    Gram matrix H H^T, instead of by an iterative solver.
+
+    A RuntimeWarning is issued if the components are linearly dependent,
+    e.g. more components than wavenumbers: the weights then still minimize
+    the residuals but are not unique.
+
+    Parameters:
+    data (numpy.ndarray | LowRankSpectra): The (n_samples, n_features)
+    spectra, possibly memory-mapped.
+    components (numpy.ndarray): The (n_components, n_features) fitted H,
+    e.g. NMF.components_.
+    block_rows (int): The number of spectra solved at a time.
+
+    Returns:
+    numpy.ndarray: The (n_samples, n_components) weights W.
+    """
+    H = np.asarray(components, dtype=np.float64)
+    if np.linalg.matrix_rank(H) < H.shape[0]:
+        warnings.warn("The components are linearly dependent, so the "
+                      "weights of the spectra are not unique",
+                      RuntimeWarning, stacklevel=2)
+    gram = H @ H.T
+    n_samples = data.shape[0]
+
+    if isinstance(data, LowRankSpectra):
+        # X H^T through the factors, for all rows at once
+        cross = data @ H.T
+    else:
+        cross = None
+
+    W = np.empty((n_samples, H.shape[0]))
+    for start in range(0, n_samples, block_rows):
+        stop = start + block_rows
+        if cross is None:
+            block_cross = np.asarray(data[start:stop], dtype=np.float64) @ H.T
+        else:
+            block_cross = cross[start:stop]
+        W[start:stop] = nnls_block_principal_pivoting(gram, block_cross.T).T
+    return W
+
+
+def _fit_factors(data: np.ndarray, n_components: int,
+                 W_init: Optional[np.ndarray] = None,
+                 H_init: Optional[np.ndarray] = None,
+                 solver: str = 'cd') -> tuple[
+    np.ndarray,
+    np.ndarray
+                ]:
+    """
+    Fit an NMF and return its factors.
+
+    W is the one computed by the fit itself, so no second solve of a
+    transform is needed.
+
+    Parameters:
+    data (numpy.ndarray): The input data.
+    n_components (int): Number of components for NMF.
+    W_init (numpy.ndarray, optional): If given with H_init, the initial
+    factors of a custom initialization.
+    H_init (numpy.ndarray, optional): See W_init.
+    solver (str): The name of a solver registered in nmf_solvers.
+
+    Returns:
+    tuple: Containing W (n_samples, n_components) and H (n_components,
+    n_features).
+    """
+    W, H, _ = fit_nmf(data, n_components, solver, W_init, H_init)
+    return W, H
+
+
+def blockwise_residuals_norm(data: np.ndarray, W: np.ndarray,
+                             H: np.ndarray,
+                             block_rows: int = 1024) -> float:
+    """
+    Calculate the Frobenius norm of the residuals of a factorization in
+    blocks of rows, without building the full reconstruction.
+
+    Parameters:
+    data (numpy.ndarray | LowRankSpectra): The input data; low-rank
+    spectra are reconstructed one block of rows at a time.
+    W (numpy.ndarray): The (n_samples, n_components) factor.
+    H (numpy.ndarray): The (n_components, n_features) factor.
+    block_rows (int): The number of rows reconstructed at a time.
+
+    Returns:
+    float: The norm of data - W @ H.
+    """
+    if not isinstance(data, LowRankSpectra):
+        data = np.asarray(data)
+    squared_norm = 0.0
+    for start in range(0, data.shape[0], block_rows):
+        stop = start + block_rows
+        residuals = data[start:stop] - W[start:stop] @ H
+        squared_norm += np.einsum('ij,ij->', residuals, residuals)
+    return float(np.sqrt(squared_norm))
+
+
+def fit_minibatch_factors(data: np.ndarray, n_components: int,
+                          batch_size: int = 1024,
+                          n_epochs: int = 50,
+                          tol: float = 1e-3) -> tuple[
+    np.ndarray,
+    np.ndarray
+                ]:
+    """
+    Fit a mini-batch NMF by streaming the data in row chunks.
+
+    Only one chunk is read into memory at a time, so the data can be a
+    memory-mapped .npy file larger than memory: H is updated online by
+    partial_fit on every chunk, pass after pass over the data, then W is
+    computed chunk by chunk with the final H.
+
+    The passes stop when the reconstruction error of a pass decreases by
+    less than tol relative to it. The error of every chunk is measured
+    right after its update, with the exact non-negative weights of
+    nnls_weights, so it costs one product with H per chunk. The stochastic
+    H updates keep changing H by about the same amount from pass to pass,
+    so the error, not H, tells when the passes stop paying off. The first
+    pass is not compared, as H is initialized from the first chunk and
+    fits it better than the next passes do.
+
+    Parameters:
+    data (numpy.ndarray | LowRankSpectra): The input data, possibly
+    memory-mapped or low-rank.
+    n_components (int): Number of components for NMF.
+    batch_size (int): The number of rows of every chunk; the first chunk
+    must have at least n_components rows.
+    n_epochs (int): The maximum number of passes over the data, each of
+    which reads all of it.
+    tol (float): The decrease of the reconstruction error over a pass,
+    relative to the error, below which the passes stop.
+
+    Returns:
+    tuple: Containing W (n_samples, n_components) and H (n_components,
+    n_features), as returned by _fit_factors.
+    """
+    if not isinstance(data, LowRankSpectra):
+        data = np.asarray(data)
+    n_samples = data.shape[0]
+    nmf = create_pipeline(n_components, batch_size).named_steps['nmf']
+
+    errors = []
+    for _ in range(n_epochs):
+        squared_error = 0.0
+        for start in range(0, n_samples, batch_size):
+            chunk = np.asarray(data[start:start + batch_size])
+            nmf.partial_fit(chunk)
+            H = nmf.components_
+            residuals = chunk - nnls_weights(chunk, H) @ H
+            squared_error += np.einsum('ij,ij->', residuals, residuals)
+        errors.append(np.sqrt(squared_error))
+        if len(errors) > 2 and errors[-2] - errors[-1] < tol * errors[-1]:
+            break
+
+    W = np.empty((n_samples, n_components), dtype=nmf.components_.dtype)
+    for start in range(0, n_samples, batch_size):
+        W[start:start + batch_size] = nmf.transform(
+            data[start:start + batch_size])
+    return W, nmf.components_
+
+
+def fit_compressed_factors(data: np.ndarray, n_components: int,
+                           rank: Optional[int] = None,
+                           solver: str = 'hals',
+                           tol: float = 1e-4,
+                           random_state: Optional[int] = 0) -> tuple[
+    np.ndarray,
+    np.ndarray
+                ]:
+    """
+    Fit an NMF on the SVD factors of the data, so every iteration costs
+    O((n_samples + n_features) * rank * n_components) instead of
+    O(n_samples * n_features * n_components).
+
+    Low-rank data, such as the SVD-denoised spectra, is factorized exactly.
+    Dense data is first compressed by a randomized SVD of the given rank,
+    and the NMF of its rank-r approximation is returned. The norm of the
+    residuals approaches the one of the coordinate descent fit of the
+    reconstructed data as tol decreases.
+
+    Parameters:
+    data (numpy.ndarray | LowRankSpectra): The input data.
+    n_components (int): Number of components for NMF.
+    rank (int, optional): The rank dense data is compressed to, defaults to
+    max(2 * n_components, n_components + 10).
+    solver (str): A solver of nmf_solvers.FACTORED_SOLVERS, 'hals' or 'pg'.
+    tol (float): The tolerance of the stopping criterion of the solver.
+    random_state (int, optional): Seed of the randomized SVD.
+
+    Returns:
+    tuple: Containing W (n_samples, n_components) and H (n_components,
+    n_features), as returned by _fit_factors.
+    """
+    if solver not in FACTORED_SOLVERS:
+        raise ValueError(f"The {solver} solver cannot run on SVD factors; "
+                         f"use one of {', '.join(sorted(FACTORED_SOLVERS))}")
+    if not isinstance(data, LowRankSpectra):
+        if rank is None:
+            rank = max(2 * n_components, n_components + 10)
+        data = LowRankSpectra.from_dense(data, rank, random_state)
+    W, H, _ = fit_nmf(data, n_components, solver, tol=tol)
+    return W, H
+
+
+# State of a residuals worker process, set by _init_residuals_worker
+_worker_state = {}
+
+
+def _init_residuals_worker(data_descriptor: tuple,
+                           batch_size: Optional[int], solver: str,
+                           n_epochs: int, epoch_tol: float) -> None:
+    """
+    Attach a worker process to the shared input data.
+
+    Parameters:
+    data_descriptor (tuple): The shared array descriptor of the data.
+    batch_size (int, optional): As in calculate_residuals.
+    solver (str): As in calculate_residuals.
+    n_epochs (int): As in calculate_residuals.
+    epoch_tol (float): As in calculate_residuals.
+    """
+    block, data = attach_shared_array(data_descriptor)
+    _worker_state.update(block=block, data=data, batch_size=batch_size,
+                         solver=solver, n_epochs=n_epochs,
+                         epoch_tol=epoch_tol)
+
+
+def _residuals_norm_in_worker(n_components: int) -> float:
+    """
+    Calculate the norm of the residuals for one number of components in a
+    worker process.
+
+    Parameters:
+    n_components (int): Number of components for NMF.
+
+    Returns:
+    float: The norm of the residuals.
+    """
+    data = _worker_state['data']
+    batch_size = _worker_state['batch_size']
+    if batch_size is None:
+        W, H = _fit_factors(data, n_components,
+                            solver=_worker_state['solver'])
+    else:
+        W, H = fit_minibatch_factors(data, n_components, batch_size,
+                                     _worker_state['n_epochs'],
+                                     _worker_state['epoch_tol'])
+    return blockwise_residuals_norm(data, W, H)
+
+
 def calculate_residuals(data: np.ndarray,
-                        n_components_range: range) -> list[float]:
+                        n_components_range: range,
+                        warm_start: bool = False,
+                        n_jobs: Optional[int] = None,
+                        batch_size: Optional[int] = None,
+                        solver: str = 'cd',
+                        n_epochs: int = 50,
+                        epoch_tol: float = 1e-3) -> list[float]:
     """
     Calculate the norms of the residuals for different numbers of components.
 
     Parameters:
     data (numpy.ndarray): The input data.
     n_components_range (range): The range of component numbers to evaluate.
+    warm_start (bool): Start every fit from the factors of the previous,
+    smaller one, padded with components derived from its residuals by
+    nndsvd_components, instead of from a new NNDSVD initialization. Only
+    for the solvers of nmf_solvers.WARM_START_SOLVERS, 'hals' and 'pg',
+    which then need fewer iterations per fit.
+    n_jobs (int, optional): The number of processes fitting different
+    numbers of components concurrently; -1 uses all CPUs. The data is
+    shared with the workers through shared memory and the norms are the
+    same as with one process. Cannot be combined with warm_start, whose
+    fits depend on each other.
+    batch_size (int, optional): If given, fit mini-batch NMFs streaming row
+    chunks of this size with fit_minibatch_factors, for data too large for
+    the batch NMF, such as a memory-mapped .npy file. Cannot be combined
+    with warm_start.
+    solver (str): The name of the solver registered in nmf_solvers fitting
+    the batch NMFs: 'cd', 'mu', 'hals' or 'pg'.
+    n_epochs (int): The maximum number of passes of the mini-batch NMFs
+    over the data, as in fit_minibatch_factors.
+    epoch_tol (float): The relative decrease of the reconstruction error
+    over a pass stopping the mini-batch NMFs, the tol of
+    fit_minibatch_factors.
 
     Returns:
     list: The norms of the residuals for each number of components.
     """
-    residuals_norm = []
+    if warm_start and solver not in WARM_START_SOLVERS:
+        raise ValueError(f"The {solver} solver stops relative to its first "
+                         f"iterations, so warm starts make it slower; use "
+                         f"one of {', '.join(sorted(WARM_START_SOLVERS))}")
+
+    n_jobs = effective_n_jobs(n_jobs)
+    if batch_size is not None:
+        if warm_start:
+            raise ValueError("warm_start is only available for the batch "
+                             "NMF and cannot use batch_size")
+        if n_jobs == 1:
+            norms = []
+            for n_components in n_components_range:
+                W, H = fit_minibatch_factors(data, n_components, batch_size,
+                                             n_epochs, epoch_tol)
+                norms.append(blockwise_residuals_norm(data, W, H))
+            return norms
+
+    if n_jobs > 1:
+        if warm_start:
+            raise ValueError("warm_start fits the numbers of components "
+                             "one after the other and cannot use n_jobs")
+        with ExitStack() as stack:
+            block, _, data_descriptor = share_array(data)
+            stack.callback(block.unlink)
+            stack.callback(block.close)
+            executor = stack.enter_context(ProcessPoolExecutor(
+                max_workers=n_jobs, initializer=_init_residuals_worker,
+                initargs=(data_descriptor, batch_size, solver, n_epochs,
+                          epoch_tol)))
+            return list(executor.map(_residuals_norm_in_worker,
+                                     n_components_range))
+
+    norms = []
+    W = H = None
 
     for n_components in n_components_range:
-        pipeline = create_pipeline(n_components)
-        pipeline.fit(data)
+        if warm_start and H is not None and H.shape[0] < n_components:
+            # Only the warm start needs the residuals themselves
+            residuals = np.asarray(data) - W @ H
+            W_extra, H_extra = nndsvd_components(residuals,
+                                                 n_components - H.shape[0])
+            del residuals
+            W, H = _fit_factors(data, n_components,
+                                np.hstack((W, W_extra)).astype(W.dtype),
+                                np.vstack((H, H_extra)).astype(H.dtype),
+                                solver)
+        else:
+            W, H = _fit_factors(data, n_components, solver=solver)
 
-        W = pipeline.named_steps['nmf'].transform(data)
-        H = pipeline.named_steps['nmf'].components_
-        spectra_reconstructed = np.dot(W, H)
-        residuals = data - spectra_reconstructed
-        norm_residuals = np.linalg.norm(residuals)
+        norms.append(blockwise_residuals_norm(data, W, H))
 
-        residuals_norm.append(norm_residuals)
+    return norms
 
-    return residuals_norm
+
+def evaluate_nmf_component_number(data: np.ndarray,
+                                  n_components_range: range,
+                                  warm_start: bool = False,
+                                  n_jobs: Optional[int] = None,
+                                  batch_size: Optional[int] = None,
+                                  solver: str = 'cd',
+                                  n_epochs: int = 50,
+                                  epoch_tol: float = 1e-3) -> pd.DataFrame:
+    """
+    Evaluate the NMF model without plotting the evaluation curve.
+
+    Parameters:
+    data (numpy.ndarray): The input data.
+    n_components_range (range): The range of component numbers to evaluate.
+    warm_start (bool): As in calculate_residuals.
+    n_jobs (int, optional): As in calculate_residuals.
+    batch_size (int, optional): As in calculate_residuals.
+    solver (str): As in calculate_residuals.
+    n_epochs (int): As in calculate_residuals.
+    epoch_tol (float): As in calculate_residuals.
+
+    Returns:
+    pandas.DataFrame: Indexed by the number of components, with the
+    'Norm of Residuals' column.
+    """
+    import pandas as pd
+
+    residuals_norm = calculate_residuals(data, n_components_range,
+                                         warm_start, n_jobs, batch_size,
+                                         solver, n_epochs, epoch_tol)
+    evaluation = pd.DataFrame({'Norm of Residuals': residuals_norm},
+                              index=list(n_components_range))
+    evaluation.index.name = 'Number of Components'
+    return evaluation
 
 
 def plot_nmf_component_evaluation_curve(n_components_range: range,
@@ -80,6 +483,8 @@ def plot_nmf_component_evaluation_curve(n_components_range: range,
     residuals_norm (list): The norms of the residuals for each
     number of components.
     """
+    import matplotlib.pyplot as plt
+
     plt.figure(figsize=(8, 3))
     plt.plot(n_components_range, residuals_norm, marker='o', linestyle='--',
              color='b')
@@ -0,0 +1,131 @@
+"""
+This module measures the import time of the src modules in fresh
+interpreters and checks it against a budget.
+It includes the following functionalities:
+
+1. Timing the import of a module in a new Python process.
+2. Checking that importing a module does not load the heavy dependencies
+   its functions import lazily.
+3. Running the benchmark from the command line, failing if a module is over
+   budget.
+
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Optional
+
+MODULES = [
+    'src.transform_data',
+    'src.evaluation_metrics_hierarchical_clustering',
+    'src.evaluation_number_NMF_components',
+    'src.nmf_solvers',
+    'src.nmf_benchmark',
+    'src.low_rank_spectra',
+    'src.adaptive_svd',
+    'src.nucleation_monitor',
+    'src.results_cache',
+    'src.shared_arrays',
+]
+
+# Dependencies no src module may load at import time
+HEAVY_DEPENDENCIES = ['pandas', 'scipy', 'sklearn', 'matplotlib']
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+loaded = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{'seconds': seconds, 'loaded': loaded}}))
+"""
+
+
+def time_import(module: str) -> tuple[float, list[str]]:
+    """
+    Import a module in a new Python process and time it.
+
+    Parameters:
+    module (str): The dotted name of the module.
+
+    Returns:
+    tuple: Containing the import time in seconds and the heavy dependencies
+    the import loaded.
+    """
+    result = subprocess.run(
+        [sys.executable, '-c',
+         _PROBE.format(module=module, heavy=HEAVY_DEPENDENCIES)],
+        cwd=Path(__file__).resolve().parents[1],
+        capture_output=True, text=True, check=True)
+    measurement = json.loads(result.stdout.strip().splitlines()[-1])
+    return measurement['seconds'], measurement['loaded']
+
+
+def benchmark_imports(modules: list[str], repeat: int = 5,
+                      budget: float = 0.5) -> bool:
+    """
+    Report the median import time of every module and check it against the
+    budget.
+
+    Parameters:
+    modules (list): The dotted names of the modules.
+    repeat (int): The number of fresh imports timed per module.
+    budget (float): The maximum median import time in seconds.
+
+    Returns:
+    bool: True if every module is within budget and loads no heavy
+    dependency.
+    """
+    within_budget = True
+    for module in modules:
+        times = []
+        loaded = []
+        for _ in range(repeat):
+            seconds, loaded = time_import(module)
+            times.append(seconds)
+        median = statistics.median(times)
+
+        status = 'ok'
+        if median > budget:
+            status = f'over budget ({budget:.3f} s)'
+            within_budget = False
+        if loaded:
+            status = f"loads {', '.join(loaded)}"
+            within_budget = False
+        print(f"{module}: {median * 1000:.1f} ms {status}")
+    return within_budget
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """
+    Main function to benchmark the import time of the src modules.
+
+    Exits with status 1 if a module is over budget or loads a heavy
+    dependency at import time.
+
+    Parameters:
+    argv (list, optional): The command line arguments, defaults to sys.argv.
+    """
+    parser = argparse.ArgumentParser(
+        description='Benchmark the import time of the src modules.')
+    parser.add_argument(
+        'modules', nargs='*', default=MODULES,
+        help='dotted module names (default: all src modules)')
+    parser.add_argument(
+        '-n', '--repeat', type=int, default=5,
+        help='number of fresh imports timed per module')
+    parser.add_argument(
+        '-b', '--budget', type=float, default=0.5,
+        help='maximum median import time in seconds')
+    args = parser.parse_args(argv)
+
+    if not benchmark_imports(args.modules, args.repeat, args.budget):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
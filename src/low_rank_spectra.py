@@ -0,0 +1,276 @@
+"""
+This module provides a low-rank representation of denoised spectra, kept
+as the factors of their truncated SVD instead of the dense reconstruction.
+It includes the following functionalities:
+
+1. Building the representation from a dense array or a fitted
+   TruncatedSVD.
+2. Reconstructing only requested blocks of rows and columns.
+3. Matrix products, norms, residual norms of factorizations and pairwise
+   distances computed directly on the factors.
+
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterator, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from sklearn.decomposition import TruncatedSVD
+
+
+class LowRankSpectra:
+    """
+    Spectra X = U diag(S) Vt of rank r, stored as their SVD factors.
+
+    The factors take (n_samples + n_features + 1) * r values instead of
+    n_samples * n_features. Dense blocks are only built when they are
+    requested, by indexing or by np.asarray.
+
+    Attributes:
+    U (numpy.ndarray): The (n_samples, r) left singular vectors, with
+    orthonormal columns.
+    S (numpy.ndarray): The (r,) singular values.
+    Vt (numpy.ndarray): The (r, n_features) right singular vectors, with
+    orthonormal rows.
+    """
+
+    # Make numpy operators such as ndarray @ LowRankSpectra defer to the
+    # factored implementations instead of reconstructing the spectra
+    __array_ufunc__ = None
+
+    def __init__(self, U: np.ndarray, S: np.ndarray, Vt: np.ndarray) -> None:
+        """
+        Wrap SVD factors.
+
+        Parameters:
+        U (numpy.ndarray): The left singular vectors (n_samples, r).
+        S (numpy.ndarray): The singular values (r,).
+        Vt (numpy.ndarray): The right singular vectors (r, n_features).
+        """
+        if not U.shape[1] == S.shape[0] == Vt.shape[0]:
+            raise ValueError(f"Inconsistent factor shapes {U.shape}, "
+                             f"{S.shape} and {Vt.shape}")
+        self.U = U
+        self.S = S
+        self.Vt = Vt
+
+    @classmethod
+    def from_dense(cls, X: np.ndarray, rank: int,
+                   random_state: Optional[int] = 0) -> LowRankSpectra:
+        """
+        Keep the rank leading singular triplets of dense spectra, as
+        TruncatedSVD(n_components=rank) followed by inverse_transform does.
+
+        Parameters:
+        X (numpy.ndarray): The spectra (n_samples, n_features).
+        rank (int): The number of singular triplets to keep.
+        random_state (int, optional): Seed of the randomized SVD.
+
+        Returns:
+        LowRankSpectra: The low-rank spectra.
+        """
+        from sklearn.utils.extmath import randomized_svd
+
+        U, S, Vt = randomized_svd(np.asarray(X, dtype=np.float64), rank,
+                                  random_state=random_state)
+        return cls(U, S, Vt)
+
+    @classmethod
+    def from_truncated_svd(cls, svd: TruncatedSVD,
+                           X: np.ndarray) -> LowRankSpectra:
+        """
+        Represent svd.inverse_transform(svd.transform(X)) by its factors.
+
+        Parameters:
+        svd (sklearn.decomposition.TruncatedSVD): The fitted SVD.
+        X (numpy.ndarray): The spectra the SVD is applied to.
+
+        Returns:
+        LowRankSpectra: The low-rank spectra.
+        """
+        embedding = svd.transform(X)
+        S = np.linalg.norm(embedding, axis=0)
+        U = embedding / np.where(S > 0, S, 1)
+        return cls(U, S, svd.components_)
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        """
+        tuple: The shape (n_samples, n_features) of the dense spectra.
+        """
+        return self.U.shape[0], self.Vt.shape[1]
+
+    @property
+    def rank(self) -> int:
+        """
+        int: The number of singular triplets.
+        """
+        return self.S.shape[0]
+
+    @property
+    def dtype(self) -> np.dtype:
+        """
+        numpy.dtype: The data type of the reconstructed spectra.
+        """
+        return np.result_type(self.U, self.S, self.Vt)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        int: The memory taken by the factors, in bytes.
+        """
+        return self.U.nbytes + self.S.nbytes + self.Vt.nbytes
+
+    @property
+    def T(self) -> LowRankSpectra:
+        """
+        LowRankSpectra: The transposed spectra, sharing the factors.
+        """
+        return LowRankSpectra(self.Vt.T, self.S, self.U.T)
+
+    def embedding(self) -> np.ndarray:
+        """
+        Return the coordinates of the spectra in the basis Vt, U diag(S).
+
+        Distances and inner products between these rows equal the ones
+        between the spectra, so they can replace the spectra in clustering.
+
+        Returns:
+        numpy.ndarray: The (n_samples, r) embedding.
+        """
+        return self.U * self.S
+
+    def __getitem__(self, key) -> np.ndarray:
+        """
+        Reconstruct a block of the spectra, selecting rows and columns with
+        any numpy index.
+
+        Parameters:
+        key: A row index, or a (row index, column index) tuple.
+
+        Returns:
+        numpy.ndarray: The dense block.
+        """
+        rows, columns = key if isinstance(key, tuple) else (key, slice(None))
+        return (self.U[rows] * self.S) @ self.Vt[:, columns]
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        """
+        Reconstruct the dense spectra, e.g. for np.asarray.
+
+        Returns:
+        numpy.ndarray: The (n_samples, n_features) spectra.
+        """
+        dense = self[:, :]
+        return dense if dtype is None else dense.astype(dtype)
+
+    def iter_row_blocks(self, block_rows: int = 1024) -> Iterator[
+            tuple[int, np.ndarray]]:
+        """
+        Reconstruct the spectra block of rows by block of rows.
+
+        Parameters:
+        block_rows (int): The number of rows of every block.
+
+        Yields:
+        tuple: Containing the index of the first row and the dense block.
+        """
+        for start in range(0, self.shape[0], block_rows):
+            yield start, self[start:start + block_rows]
+
+    def __matmul__(self, other: np.ndarray) -> np.ndarray:
+        """
+        Multiply the spectra by a matrix on the right, X @ B.
+
+        Parameters:
+        other (numpy.ndarray): The (n_features, m) matrix.
+
+        Returns:
+        numpy.ndarray: The (n_samples, m) product.
+        """
+        return self.U @ (self.S[:, None] * (self.Vt @ other))
+
+    def __rmatmul__(self, other: np.ndarray) -> np.ndarray:
+        """
+        Multiply the spectra by a matrix on the left, A @ X.
+
+        Parameters:
+        other (numpy.ndarray): The (m, n_samples) matrix.
+
+        Returns:
+        numpy.ndarray: The (m, n_features) product.
+        """
+        return ((other @ self.U) * self.S) @ self.Vt
+
+    def squared_norm(self) -> float:
+        """
+        Calculate the squared Frobenius norm of the spectra.
+
+        Returns:
+        float: ||X||^2, the sum of the squared singular values.
+        """
+        return float(self.S @ self.S)
+
+    def norm(self) -> float:
+        """
+        Calculate the Frobenius norm of the spectra.
+
+        Returns:
+        float: ||X||.
+        """
+        return float(np.sqrt(self.squared_norm()))
+
+    def row_norms(self, squared: bool = False) -> np.ndarray:
+        """
+        Calculate the Euclidean norms of the spectra.
+
+        Parameters:
+        squared (bool): Return the squared norms.
+
+        Returns:
+        numpy.ndarray: The (n_samples,) norms.
+        """
+        embedding = self.embedding()
+        norms = np.einsum('ij,ij->i', embedding, embedding)
+        return norms if squared else np.sqrt(norms)
+
+    def residuals_norm(self, W: np.ndarray, H: np.ndarray) -> float:
+        """
+        Calculate the norm of the residuals of a factorization X ~ W H
+        without reconstructing X, through the trace identity
+        ||X - W H||^2 = ||X||^2 - 2 tr(W^T X H^T) + tr(W^T W H H^T).
+
+        Parameters:
+        W (numpy.ndarray): The (n_samples, n_components) factor.
+        H (numpy.ndarray): The (n_components, n_features) factor.
+
+        Returns:
+        float: The norm of X - W H.
+        """
+        cross = np.einsum('ij,ij->', (W.T @ self.U) * self.S, H @ self.Vt.T)
+        gram = np.einsum('ij,ij->', W.T @ W, H @ H.T)
+        return float(np.sqrt(max(self.squared_norm() - 2 * cross + gram,
+                                 0.0)))
+
+    def pairwise_distances(self, rows: Optional[np.ndarray] = None
+                           ) -> np.ndarray:
+        """
+        Calculate the Euclidean distances between spectra from their
+        r-dimensional embedding instead of their n_features intensities.
+
+        Parameters:
+        rows (numpy.ndarray, optional): The indices of the spectra, defaults
+        to all of them.
+
+        Returns:
+        numpy.ndarray: The square distance matrix.
+        """
+        from sklearn.metrics import pairwise_distances
+
+        embedding = self.embedding()
+        if rows is not None:
+            embedding = embedding[rows]
+        return pairwise_distances(embedding)
@@ -0,0 +1,258 @@
+"""
+This module benchmarks the NMF solvers of nmf_solvers on synthetic Raman
+spectra campaigns.
+It includes the following functionalities:
+
+1. Generating mixtures of pure component spectra made of Gaussian and
+   Lorentzian peaks, with concentration profiles and noise.
+2. Timing every solver and recording its iterations to tolerance and final
+   residual norm, or the time and iterations it needs to reach a common
+   target residual norm.
+3. Running the benchmark from the command line.
+
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+import warnings
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+
+from .evaluation_number_NMF_components import blockwise_residuals_norm
+from .nmf_solvers import SOLVERS, fit_nmf
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def synthetic_spectra(n_samples: int = 2000, n_features: int = 990,
+                      n_components: int = 3, peaks_per_component: int = 6,
+                      noise: float = 0.01,
+                      random_state: Optional[int] = 0) -> np.ndarray:
+    """
+    Generate non-negative spectra mixing pure component spectra.
+
+    Every pure spectrum is a sum of Gaussian and Lorentzian peaks of random
+    position, width and height on the wavenumber grid. The concentrations
+    follow smooth random profiles over time, and non-negative noise is
+    added.
+
+    Parameters:
+    n_samples (int): The number of spectra.
+    n_features (int): The number of wavenumbers.
+    n_components (int): The number of pure components.
+    peaks_per_component (int): The number of peaks of every pure spectrum.
+    noise (float): The standard deviation of the noise relative to the
+    largest intensity.
+    random_state (int, optional): Seed of the generator.
+
+    Returns:
+    numpy.ndarray: The (n_samples, n_features) spectra.
+    """
+    rng = np.random.default_rng(random_state)
+    grid = np.arange(n_features)
+
+    components = np.zeros((n_components, n_features))
+    for component in components:
+        for peak in range(peaks_per_component):
+            center = rng.uniform(0, n_features)
+            width = rng.uniform(2, 20)
+            height = rng.uniform(0.2, 1)
+            if peak % 2:
+                component += height / (1 + ((grid - center) / width) ** 2)
+            else:
+                component += height * np.exp(
+                    -0.5 * ((grid - center) / width) ** 2)
+
+    # Smooth concentration profiles: sigmoids rising or falling at random
+    # times
+    t = np.linspace(0, 1, n_samples)[:, None]
+    onsets = rng.uniform(0.1, 0.9, n_components)
+    slopes = rng.choice([-1, 1], n_components) * rng.uniform(5, 30,
+                                                             n_components)
+    concentrations = 1 / (1 + np.exp(-slopes * (t - onsets)))
+
+    spectra = concentrations @ components
+    spectra += rng.normal(0, noise * spectra.max(), spectra.shape)
+    return np.maximum(spectra, 0)
+
+
+def _fit_iterations(data: np.ndarray, n_components: int, solver: str,
+                    n_iter: int) -> tuple[float, float]:
+    """
+    Fit an NMF with a fixed number of iterations and time it.
+
+    Parameters:
+    data (numpy.ndarray): The input data.
+    n_components (int): Number of components for NMF.
+    solver (str): The name of the solver.
+    n_iter (int): The number of iterations, run without a stopping
+    criterion.
+
+    Returns:
+    tuple: Containing the fit time in seconds and the norm of the
+    residuals.
+    """
+    from sklearn.exceptions import ConvergenceWarning
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', ConvergenceWarning)
+        start = time.perf_counter()
+        W, H, _ = fit_nmf(data, n_components, solver, tol=0,
+                          max_iter=n_iter)
+        seconds = time.perf_counter() - start
+    return seconds, blockwise_residuals_norm(data, W, H)
+
+
+def time_to_target(data: np.ndarray, n_components: int, solver: str,
+                   target: float,
+                   max_iter: int = 10000) -> tuple[float, int, float]:
+    """
+    Find the fewest iterations of a solver reaching a target norm of the
+    residuals, and time a fit running them.
+
+    The solvers stop on criteria that are not comparable, so the number of
+    iterations is searched instead, by doubling then bisection over fits
+    run without a stopping criterion. Every solver is then compared at the
+    same quality of the factorization.
+
+    Parameters:
+    data (numpy.ndarray): The input data.
+    n_components (int): Number of components for NMF.
+    solver (str): The name of the solver.
+    target (float): The norm of the residuals to reach, relative to the
+    norm of the data.
+    max_iter (int): The maximum number of iterations searched.
+
+    Returns:
+    tuple: Containing the fit time in seconds, the number of iterations and
+    the norm of the residuals of the fit, with NaN time and iterations if
+    the target is not reached in max_iter iterations.
+    """
+    target_norm = target * np.linalg.norm(data)
+
+    # Double the iterations until the target is reached
+    low, high = 0, 1
+    while True:
+        seconds, norm = _fit_iterations(data, n_components, solver, high)
+        if norm <= target_norm:
+            break
+        if high >= max_iter:
+            return np.nan, np.nan, norm
+        low, high = high, min(2 * high, max_iter)
+
+    # The residuals only decrease with the iterations
+    while high - low > 1:
+        middle = (low + high) // 2
+        if _fit_iterations(data, n_components, solver,
+                           middle)[1] <= target_norm:
+            high = middle
+        else:
+            low = middle
+    seconds, norm = _fit_iterations(data, n_components, solver, high)
+    return seconds, high, norm
+
+
+def benchmark_solvers(data: np.ndarray, n_components: int,
+                      solvers: Optional[list[str]] = None,
+                      tol: float = 1e-4,
+                      max_iter: int = 10000,
+                      target: Optional[float] = None) -> pd.DataFrame:
+    """
+    Fit an NMF with every solver and record its cost and quality.
+
+    By default every solver stops on its own criterion: scikit-learn's
+    coordinate descent on its projected gradient violation, scikit-learn's
+    multiplicative update on the error checked every 10 iterations, and the
+    numpy solvers on the decrease of the error per iteration. Their times
+    and iterations are then reached at different residuals. With a target,
+    every solver runs until the same relative norm of the residuals, see
+    time_to_target, so the times are comparable.
+
+    Parameters:
+    data (numpy.ndarray): The input data.
+    n_components (int): Number of components for NMF.
+    solvers (list, optional): The names of the solvers, defaults to every
+    registered solver.
+    tol (float): The tolerance of every solver, without a target.
+    max_iter (int): The maximum number of iterations of every solver.
+    target (float, optional): The norm of the residuals relative to the
+    norm of the data every solver has to reach.
+
+    Returns:
+    pandas.DataFrame: Indexed by solver, with the fit time in seconds, the
+    iterations to tolerance (or to the target), the norm of the residuals
+    and the norm of the residuals relative to the norm of the data.
+    """
+    import pandas as pd
+
+    data = np.asarray(data, dtype=np.float64)
+    data_norm = np.linalg.norm(data)
+
+    records = {}
+    for solver in solvers or sorted(SOLVERS):
+        if target is None:
+            start = time.perf_counter()
+            W, H, n_iter = fit_nmf(data, n_components, solver, tol=tol,
+                                   max_iter=max_iter)
+            seconds = time.perf_counter() - start
+            norm = blockwise_residuals_norm(data, W, H)
+        else:
+            seconds, n_iter, norm = time_to_target(data, n_components,
+                                                   solver, target, max_iter)
+        records[solver] = {
+            'Seconds': seconds,
+            'Iterations': n_iter,
+            'Norm of Residuals': norm,
+            'Relative Norm of Residuals': norm / data_norm,
+        }
+
+    benchmark = pd.DataFrame.from_dict(records, orient='index')
+    benchmark.index.name = 'Solver'
+    return benchmark
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """
+    Main function to benchmark the NMF solvers on synthetic spectra.
+
+    Parameters:
+    argv (list, optional): The command line arguments, defaults to sys.argv.
+    """
+    parser = argparse.ArgumentParser(
+        description='Benchmark the NMF solvers on synthetic spectra.')
+    parser.add_argument(
+        '-s', '--samples', type=int, default=2000,
+        help='number of synthetic spectra')
+    parser.add_argument(
+        '-w', '--wavenumbers', type=int, default=990,
+        help='number of wavenumbers of every spectrum')
+    parser.add_argument(
+        '-k', '--components', type=int, default=3,
+        help='number of pure components mixed and fitted')
+    parser.add_argument(
+        '--solvers', nargs='*', default=None, choices=sorted(SOLVERS),
+        help='solvers to benchmark (default: all)')
+    parser.add_argument(
+        '--tol', type=float, default=1e-4,
+        help='tolerance of every solver')
+    parser.add_argument(
+        '--max-iter', type=int, default=10000,
+        help='maximum number of iterations of every solver')
+    parser.add_argument(
+        '--target', type=float, default=None,
+        help='run every solver until this norm of the residuals relative '
+             'to the norm of the data, instead of to its own tolerance')
+    args = parser.parse_args(argv)
+
+    data = synthetic_spectra(args.samples, args.wavenumbers,
+                             args.components)
+    print(benchmark_solvers(data, args.components, args.solvers, args.tol,
+                            args.max_iter, args.target).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,514 @@
+"""
+This module provides interchangeable solvers for the Frobenius norm
+Non-negative Matrix Factorization (NMF) X ~ W H.
+It includes the following functionalities:
+
+1. Registering solvers under a name and fitting an NMF with any of them.
+2. Deriving NNDSVD-style non-negative components from singular pairs, used
+   to initialize the solvers.
+3. The scikit-learn coordinate descent ('cd') and multiplicative update
+   ('mu') solvers.
+4. Hierarchical alternating least squares ('hals') and alternating
+   projected gradient ('pg') solvers implemented with numpy. They only
+   touch the data through products and its norm, so they also run on
+   LowRankSpectra without reconstructing them, in O((n + d) r k) per
+   iteration instead of O(n d k).
+5. A batched non-negative least squares solver for the weights of many
+   spectra on fixed components.
+
+Every solver takes the data, the initial factors, a tolerance and an
+iteration budget, and returns W, H and the number of iterations run.
+
+"""
+
+from typing import Callable, Optional
+
+import numpy as np
+
+from .low_rank_spectra import LowRankSpectra
+
+# Solver functions by name, filled by register_solver
+SOLVERS = {}
+
+# Names of the solvers running on LowRankSpectra factors
+FACTORED_SOLVERS = set()
+
+# Names of the solvers whose stopping criterion does not depend on the
+# initialization, so starting them close to the solution saves iterations
+WARM_START_SOLVERS = set()
+
+# Floor of the factor entries of the numpy solvers, so no entry gets stuck
+# at zero
+_EPSILON = 1e-16
+
+
+def register_solver(name: str, factored: bool = False,
+                    warm_start: bool = False) -> Callable:
+    """
+    Register an NMF solver under a name.
+
+    Parameters:
+    name (str): The name fit_nmf selects the solver by.
+    factored (bool): Whether the solver accepts LowRankSpectra; other
+    solvers receive the reconstructed dense array.
+    warm_start (bool): Whether the stopping criterion of the solver is
+    independent of its initialization. Criteria relative to the first
+    iterations, such as scikit-learn's, get stricter the better the
+    initialization, so warm starts run longer than cold ones.
+
+    Returns:
+    function: A decorator registering the solver and returning it
+    unchanged.
+    """
+    def decorator(solver: Callable) -> Callable:
+        SOLVERS[name] = solver
+        if factored:
+            FACTORED_SOLVERS.add(name)
+        if warm_start:
+            WARM_START_SOLVERS.add(name)
+        return solver
+    return decorator
+
+
+def nndsvd_components(residuals: np.ndarray,
+                      n_components: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Derive non-negative components from the leading singular pairs of the
+    residuals of a factorization, as NNDSVD initializes its components.
+
+    Every singular pair is split into its positive and negative parts and
+    the pair with the larger norm is kept. Zeros are replaced by a small
+    value on the square root scale of the residuals, as NNDSVDa does, so
+    multiplicative updates can move away from them while the products of
+    the filled entries stay negligible at any scale of the data.
+
+    Parameters:
+    residuals (numpy.ndarray | LowRankSpectra): The residuals of the data
+    (n_samples, n_features). The singular pairs of low-rank residuals are
+    read from their factors.
+    n_components (int): The number of components to derive.
+
+    Returns:
+    tuple: Containing the (n_samples, n_components) W columns and the
+    (n_components, n_features) H rows.
+    """
+    if isinstance(residuals, LowRankSpectra):
+        # Singular pairs beyond the rank are zero
+        U = np.zeros((residuals.shape[0], n_components))
+        S = np.zeros(n_components)
+        V = np.zeros((n_components, residuals.shape[1]))
+        rank = min(n_components, residuals.rank)
+        U[:, :rank] = residuals.U[:, :rank]
+        S[:rank] = residuals.S[:rank]
+        V[:rank] = residuals.Vt[:rank]
+        # Root mean square instead of the mean absolute value, which would
+        # need the reconstruction
+        scale = np.sqrt(residuals.squared_norm() / np.prod(residuals.shape))
+    else:
+        from sklearn.utils.extmath import randomized_svd
+
+        U, S, V = randomized_svd(residuals, n_components, random_state=0)
+        scale = np.abs(residuals).mean()
+    # Entries of W and H multiply, so each is on the square root scale
+    fill = np.sqrt(scale / n_components) / 100
+
+    W = np.zeros((residuals.shape[0], n_components))
+    H = np.zeros((n_components, residuals.shape[1]))
+    for j in range(n_components):
+        x, y = U[:, j], V[j, :]
+        x_p, y_p = np.maximum(x, 0), np.maximum(y, 0)
+        x_n, y_n = np.maximum(-x, 0), np.maximum(-y, 0)
+        x_p_norm, y_p_norm = np.linalg.norm(x_p), np.linalg.norm(y_p)
+        x_n_norm, y_n_norm = np.linalg.norm(x_n), np.linalg.norm(y_n)
+        m_p, m_n = x_p_norm * y_p_norm, x_n_norm * y_n_norm
+
+        if m_p > m_n:
+            u, v, sigma = x_p / x_p_norm, y_p / y_p_norm, m_p
+        elif m_n > 0:
+            u, v, sigma = x_n / x_n_norm, y_n / y_n_norm, m_n
+        else:
+            continue
+        scale = np.sqrt(S[j] * sigma)
+        W[:, j] = scale * u
+        H[j, :] = scale * v
+
+    W[W == 0] = fill
+    H[H == 0] = fill
+    return W, H
+
+
+def fit_nmf(X: np.ndarray, n_components: int, solver: str = 'cd',
+            W_init: Optional[np.ndarray] = None,
+            H_init: Optional[np.ndarray] = None,
+            tol: float = 1e-4,
+            max_iter: int = 100000) -> tuple[np.ndarray, np.ndarray, int]:
+    """
+    Fit an NMF with a registered solver.
+
+    Parameters:
+    X (numpy.ndarray | LowRankSpectra): The non-negative input data. Solvers
+    not in FACTORED_SOLVERS reconstruct low-rank data first.
+    n_components (int): Number of components for NMF.
+    solver (str): The name of the solver, one of SOLVERS.
+    W_init (numpy.ndarray, optional): If given with H_init, the initial
+    factors; otherwise they are derived from X by nndsvd_components, or by
+    scikit-learn's NNDSVD for its own solvers.
+    H_init (numpy.ndarray, optional): See W_init.
+    tol (float): The tolerance of the stopping criterion of the solver.
+    max_iter (int): The maximum number of iterations.
+
+    Returns:
+    tuple: Containing W (n_samples, n_components), H (n_components,
+    n_features) and the number of iterations run.
+    """
+    if solver not in SOLVERS:
+        raise ValueError(f"Unknown NMF solver: {solver}. Available solvers: "
+                         f"{', '.join(sorted(SOLVERS))}")
+    if not (isinstance(X, LowRankSpectra) and solver in FACTORED_SOLVERS):
+        X = np.asarray(X, dtype=np.float64)
+    return SOLVERS[solver](X, n_components, W_init, H_init, tol, max_iter)
+
+
+def _sklearn_solver(X: np.ndarray, n_components: int, W_init: np.ndarray,
+                    H_init: np.ndarray, tol: float, max_iter: int,
+                    solver: str, init: str) -> tuple[np.ndarray, np.ndarray,
+                                                     int]:
+    """
+    Fit an NMF with a scikit-learn solver, with the settings of
+    evaluation_number_NMF_components.create_pipeline.
+
+    Parameters:
+    X, n_components, W_init, H_init, tol, max_iter: As in fit_nmf.
+    solver (str): The scikit-learn solver, 'cd' or 'mu'.
+    init (str): The scikit-learn initialization without initial factors.
+
+    Returns:
+    tuple: As returned by fit_nmf.
+    """
+    from sklearn.decomposition import NMF
+
+    nmf = NMF(n_components=n_components,
+              init=init if W_init is None else 'custom',
+              solver=solver,
+              beta_loss='frobenius',
+              tol=tol,
+              random_state=0,
+              max_iter=max_iter,
+              shuffle=True)
+    W = nmf.fit_transform(X, W=W_init, H=H_init)
+    return W, nmf.components_, nmf.n_iter_
+
+
+@register_solver('cd')
+def coordinate_descent(X: np.ndarray, n_components: int, W_init: np.ndarray,
+                       H_init: np.ndarray, tol: float,
+                       max_iter: int) -> tuple[np.ndarray, np.ndarray, int]:
+    """
+    Fit an NMF with scikit-learn's coordinate descent solver.
+
+    Parameters:
+    X, n_components, W_init, H_init, tol, max_iter: As in fit_nmf.
+
+    Returns:
+    tuple: As returned by fit_nmf.
+    """
+    return _sklearn_solver(X, n_components, W_init, H_init, tol, max_iter,
+                           'cd', 'nndsvd')
+
+
+@register_solver('mu')
+def multiplicative_update(X: np.ndarray, n_components: int,
+                          W_init: np.ndarray, H_init: np.ndarray, tol: float,
+                          max_iter: int) -> tuple[np.ndarray, np.ndarray,
+                                                  int]:
+    """
+    Fit an NMF with scikit-learn's multiplicative update solver.
+
+    The zeros of plain NNDSVD would never be updated by multiplicative
+    updates, so the NNDSVDa variant initializes it.
+
+    Parameters:
+    X, n_components, W_init, H_init, tol, max_iter: As in fit_nmf.
+
+    Returns:
+    tuple: As returned by fit_nmf.
+    """
+    return _sklearn_solver(X, n_components, W_init, H_init, tol, max_iter,
+                           'mu', 'nndsvda')
+
+
+def _initial_factors(X: np.ndarray, n_components: int, W_init: np.ndarray,
+                     H_init: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Return writable copies of the initial factors of a numpy solver.
+
+    Parameters:
+    X, n_components, W_init, H_init: As in fit_nmf.
+
+    Returns:
+    tuple: Containing the initial W and H.
+    """
+    if W_init is None:
+        return nndsvd_components(X, n_components)
+    return (np.array(W_init, dtype=np.float64),
+            np.array(H_init, dtype=np.float64))
+
+
+def _squared_norm(X: np.ndarray) -> float:
+    """
+    Calculate the squared Frobenius norm of dense or low-rank data.
+
+    Parameters:
+    X (numpy.ndarray | LowRankSpectra): The data.
+
+    Returns:
+    float: ||X||^2.
+    """
+    if isinstance(X, LowRankSpectra):
+        return X.squared_norm()
+    return np.einsum('ij,ij->', X, X)
+
+
+def _squared_error(X_squared_norm: float, WtX: np.ndarray, WtW: np.ndarray,
+                   H: np.ndarray) -> float:
+    """
+    Calculate ||X - W H||^2 from the Gram matrices of W, without building
+    the reconstruction.
+
+    Parameters:
+    X_squared_norm (float): ||X||^2.
+    WtX (numpy.ndarray): W^T X.
+    WtW (numpy.ndarray): W^T W.
+    H (numpy.ndarray): The H factor.
+
+    Returns:
+    float: The squared Frobenius norm of the residuals.
+    """
+    return max(X_squared_norm - 2 * np.einsum('ij,ij->', WtX, H)
+               + np.einsum('ij,ij->', WtW, H @ H.T), 0.0)
+
+
+def _converged(errors: list[float], tol: float) -> bool:
+    """
+    Check the stopping criterion of the numpy solvers: the last decrease
+    of the error relative to the current error is below the tolerance.
+
+    Unlike a decrease relative to the initial error, as scikit-learn's
+    multiplicative update solver uses, the criterion does not depend on the
+    scale of the data or on how far the initialization is from the
+    solution.
+
+    Parameters:
+    errors (list): The errors after every iteration, the initial one first.
+    tol (float): The tolerance.
+
+    Returns:
+    bool: True if the solver has converged.
+    """
+    return (len(errors) > 1
+            and errors[-2] - errors[-1] < tol * errors[-1])
+
+
+def _hals_update(factor: np.ndarray, cross: np.ndarray,
+                 gram: np.ndarray) -> None:
+    """
+    Update the columns of a factor in place by one HALS sweep.
+
+    Parameters:
+    factor (numpy.ndarray): The (n, n_components) factor to update.
+    cross (numpy.ndarray): The (n, n_components) product of the data with
+    the other factor.
+    gram (numpy.ndarray): The Gram matrix of the other factor.
+    """
+    for j in range(factor.shape[1]):
+        factor[:, j] = np.maximum(
+            factor[:, j]
+            + (cross[:, j] - factor @ gram[:, j]) / max(gram[j, j],
+                                                        _EPSILON),
+            _EPSILON)
+
+
+@register_solver('hals', factored=True, warm_start=True)
+def hierarchical_alternating_least_squares(
+        X: np.ndarray, n_components: int, W_init: np.ndarray,
+        H_init: np.ndarray, tol: float,
+        max_iter: int) -> tuple[np.ndarray, np.ndarray, int]:
+    """
+    Fit an NMF by hierarchical alternating least squares.
+
+    Every iteration solves exactly for one column of W (then one row of H)
+    at a time with the others fixed. Each column update is a vectorized
+    rank-one correction, and the products with the data are computed once
+    per iteration.
+
+    Parameters:
+    X, n_components, W_init, H_init, tol, max_iter: As in fit_nmf.
+
+    Returns:
+    tuple: As returned by fit_nmf.
+    """
+    W, H = _initial_factors(X, n_components, W_init, H_init)
+    X_squared_norm = _squared_norm(X)
+    errors = [np.sqrt(_squared_error(X_squared_norm, W.T @ X, W.T @ W, H))]
+
+    n_iter = 0
+    while n_iter < max_iter and not _converged(errors, tol):
+        _hals_update(W, X @ H.T, H @ H.T)
+        WtX = W.T @ X
+        WtW = W.T @ W
+        H_transposed = np.ascontiguousarray(H.T)
+        _hals_update(H_transposed, WtX.T, WtW)
+        H = H_transposed.T
+
+        errors.append(np.sqrt(_squared_error(X_squared_norm, WtX, WtW, H)))
+        n_iter += 1
+    return W, H, n_iter
+
+
+@register_solver('pg', factored=True, warm_start=True)
+def projected_gradient(X: np.ndarray, n_components: int, W_init: np.ndarray,
+                       H_init: np.ndarray, tol: float, max_iter: int,
+                       inner_iter: int = 5) -> tuple[np.ndarray, np.ndarray,
+                                                     int]:
+    """
+    Fit an NMF by alternating projected gradient.
+
+    Every iteration takes inner_iter projected gradient steps on H, then on
+    W, each with the step 1 / L, where L is the Lipschitz constant of the
+    gradient (the largest eigenvalue of the Gram matrix of the fixed
+    factor).
+
+    Parameters:
+    X, n_components, W_init, H_init, tol, max_iter: As in fit_nmf.
+    inner_iter (int): The number of gradient steps per factor and
+    iteration.
+
+    Returns:
+    tuple: As returned by fit_nmf.
+    """
+    W, H = _initial_factors(X, n_components, W_init, H_init)
+    X_squared_norm = _squared_norm(X)
+    errors = [np.sqrt(_squared_error(X_squared_norm, W.T @ X, W.T @ W, H))]
+
+    n_iter = 0
+    while n_iter < max_iter and not _converged(errors, tol):
+        WtX = W.T @ X
+        WtW = W.T @ W
+        step = 1 / max(np.linalg.eigvalsh(WtW)[-1], _EPSILON)
+        for _ in range(inner_iter):
+            H = np.maximum(H - step * (WtW @ H - WtX), _EPSILON)
+
+        XHt = X @ H.T
+        HHt = H @ H.T
+        step = 1 / max(np.linalg.eigvalsh(HHt)[-1], _EPSILON)
+        for _ in range(inner_iter):
+            W = np.maximum(W - step * (W @ HHt - XHt), _EPSILON)
+
+        errors.append(np.sqrt(_squared_error(X_squared_norm, W.T @ X,
+                                             W.T @ W, H)))
+        n_iter += 1
+    return W, H, n_iter
+
+
+def _nnls_active_set(gram: np.ndarray, cross: np.ndarray) -> np.ndarray:
+    """
+    Solve non-negative least squares problems given by their Gram matrix
+    one column at a time with scipy's active set solver.
+
+    scipy.optimize.nnls needs A and b, so an equivalent pair is rebuilt
+    from the eigendecomposition V diag(e) V^T of the Gram matrix: A =
+    diag(sqrt(e)) V^T and b = diag(1 / sqrt(e)) V^T A^T b over the positive
+    eigenvalues, which leaves ||A x - b|| unchanged up to a constant.
+
+    Parameters:
+    gram (numpy.ndarray): The (k, k) Gram matrix A^T A.
+    cross (numpy.ndarray): The (k, n) products A^T b of the n problems.
+
+    Returns:
+    numpy.ndarray: The (k, n) non-negative solutions.
+    """
+    from scipy.optimize import nnls
+
+    eigenvalues, eigenvectors = np.linalg.eigh(gram)
+    positive = eigenvalues > eigenvalues[-1] * gram.shape[0] * np.finfo(
+        np.float64).eps
+    roots = np.sqrt(eigenvalues[positive])
+    A = roots[:, None] * eigenvectors[:, positive].T
+    B = (eigenvectors[:, positive].T @ cross) / roots[:, None]
+    return np.column_stack([nnls(A, b)[0] for b in B.T])
+
+
+def nnls_block_principal_pivoting(gram: np.ndarray, cross: np.ndarray,
+                                  max_iter: int = 100) -> np.ndarray:
+    """
+    Solve many non-negative least squares problems sharing their Gram
+    matrix by block principal pivoting (Kim and Park, 2011).
+
+    Every column x of the solution minimizes ||A x - b|| with x >= 0, given
+    only the Gram matrix A^T A and the column A^T b. All columns pivot
+    together. The columns whose passive sets coincide are solved with a
+    single factorization of the corresponding block of the Gram matrix.
+
+    The pivoting rule terminates for a positive definite Gram matrix. A
+    singular one, e.g. from more components than features, can make it
+    cycle, so the columns still infeasible after max_iter pivots are
+    solved by scipy's active set solver instead.
+
+    Parameters:
+    gram (numpy.ndarray): The (k, k) Gram matrix A^T A.
+    cross (numpy.ndarray): The (k, n) products A^T b of the n problems.
+    max_iter (int): The maximum number of pivots.
+
+    Returns:
+    numpy.ndarray: The (k, n) non-negative solutions.
+    """
+    k, n = cross.shape
+    passive = np.zeros((k, n), dtype=bool)
+    X = np.zeros((k, n))
+    Y = -cross.astype(np.float64)
+    # Pivoting rule state: the number of full exchanges left before falling
+    # back to single exchanges, and the smallest infeasibility seen so far
+    alpha = np.full(n, 3)
+    beta = np.full(n, k + 1)
+
+    for _ in range(max_iter):
+        infeasible = (passive & (X < 0)) | (~passive & (Y < 0))
+        n_infeasible = infeasible.sum(axis=0)
+        not_optimal = n_infeasible > 0
+        if not not_optimal.any():
+            return X
+
+        full_exchange = not_optimal & (n_infeasible < beta)
+        beta[full_exchange] = n_infeasible[full_exchange]
+        alpha[full_exchange] = 3
+        backup_exchange = not_optimal & ~full_exchange & (alpha >= 1)
+        alpha[backup_exchange] -= 1
+        single_exchange = not_optimal & ~full_exchange & ~backup_exchange
+
+        exchange = infeasible & (full_exchange | backup_exchange)
+        columns = np.flatnonzero(single_exchange)
+        last = k - 1 - np.argmax(infeasible[::-1, columns], axis=0)
+        exchange[last, columns] = True
+        passive ^= exchange
+
+        # Solve the changed columns, grouped by passive set
+        changed = np.flatnonzero(not_optimal)
+        patterns, groups = np.unique(passive[:, changed].T, axis=0,
+                                     return_inverse=True)
+        for group, pattern in enumerate(patterns):
+            columns = changed[groups.ravel() == group]
+            X[:, columns] = 0
+            if pattern.any():
+                X[np.ix_(pattern, columns)] = np.linalg.lstsq(
+                    gram[np.ix_(pattern, pattern)],
+                    cross[np.ix_(pattern, columns)], rcond=None)[0]
+            Y[:, columns] = (gram[:, pattern] @ X[np.ix_(pattern, columns)]
+                             - cross[:, columns])
+            Y[np.ix_(pattern, columns)] = 0
+
+    # The pivoting cycles, e.g. on a singular Gram matrix
+    infeasible = (passive & (X < 0)) | (~passive & (Y < 0))
+    columns = np.flatnonzero(infeasible.any(axis=0))
+    if columns.size:
+        X[:, columns] = _nnls_active_set(gram, cross[:, columns])
+    return X
@@ -0,0 +1,371 @@
+"""
+This module monitors the nucleation of a crystallization in real time, by
+projecting spectra onto fixed NMF components as they are acquired.
+It includes the following functionalities:
+
+1. Streaming spectra from a file being appended to, a socket, or a replay
+   of recorded spectra at the acquisition interval.
+2. Projecting every spectrum onto the components and raising an alarm when
+   the weight of the nucleation component stands out.
+3. Bounding the latency per spectrum with a bounded queue that drops the
+   oldest spectra when the projection falls behind, and measuring the
+   latency percentiles.
+4. Running the monitor from the command line.
+
+Streamed files and sockets carry one spectrum per line, as whitespace
+separated intensities on the wavenumbers of the components. Malformed
+lines are skipped and counted, so one bad line does not stop the monitor.
+
+"""
+
+import argparse
+import asyncio
+import time
+from typing import AsyncIterator, NamedTuple, Optional
+
+import numpy as np
+
+from .evaluation_number_NMF_components import nnls_weights
+
+# Interval in seconds between spectra, as defined in the paper
+ACQUISITION_INTERVAL = 0.04562
+
+
+class MonitorEvent(NamedTuple):
+    """
+    The result of monitoring one spectrum.
+
+    Attributes:
+    index (int): The position of the spectrum in the stream.
+    weights (numpy.ndarray): The (n_components,) weights of the spectrum.
+    fraction (float): The fraction of the total weight carried by the
+    nucleation component.
+    alarm (bool): Whether nucleation is detected at this spectrum.
+    latency (float): The seconds from the arrival of the spectrum to the
+    event.
+    dropped (int): The number of spectra dropped so far to bound the
+    latency.
+    malformed (int): The number of malformed spectra skipped so far.
+    """
+    index: int
+    weights: np.ndarray
+    fraction: float
+    alarm: bool
+    latency: float
+    dropped: int
+    malformed: int
+
+
+def _parse_spectrum(line: bytes) -> Optional[np.ndarray]:
+    """
+    Parse one streamed spectrum.
+
+    Parameters:
+    line (bytes): Whitespace separated intensities.
+
+    Returns:
+    numpy.ndarray: The intensities, or None for a blank or comment line.
+    A line that is not numeric gives an empty array, which the monitor
+    counts as malformed.
+    """
+    line = line.split(b'#', 1)[0].strip()
+    if not line:
+        return None
+    try:
+        return np.array(line.split(), dtype=np.float64)
+    except ValueError:
+        return np.empty(0)
+
+
+async def follow_spectra_file(file_path: str,
+                              poll_interval: float = 0.005,
+                              from_start: bool = True) -> AsyncIterator[
+        np.ndarray]:
+    """
+    Stream the spectra appended to a file, as tail -f does.
+
+    Parameters:
+    file_path (str): The path of the file, one spectrum per line.
+    poll_interval (float): The seconds between checks for new lines.
+    from_start (bool): Stream the spectra already in the file first;
+    otherwise only the ones appended later.
+
+    Yields:
+    numpy.ndarray: The spectra.
+    """
+    with open(file_path, 'rb') as file:
+        if not from_start:
+            file.seek(0, 2)
+        pending = b''
+        while True:
+            chunk = file.readline()
+            if not chunk:
+                await asyncio.sleep(poll_interval)
+                continue
+            pending += chunk
+            # A line without its newline is still being written
+            if not pending.endswith(b'\n'):
+                continue
+            spectrum = _parse_spectrum(pending)
+            pending = b''
+            if spectrum is not None:
+                yield spectrum
+
+
+async def socket_spectra(host: str, port: int) -> AsyncIterator[np.ndarray]:
+    """
+    Stream the spectra sent over a TCP connection until it is closed.
+
+    Parameters:
+    host (str): The host of the spectrometer stream.
+    port (int): The port of the spectrometer stream.
+
+    Yields:
+    numpy.ndarray: The spectra.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while line := await reader.readline():
+            spectrum = _parse_spectrum(line)
+            if spectrum is not None:
+                yield spectrum
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def simulated_spectra(spectra: np.ndarray,
+                            interval: float = ACQUISITION_INTERVAL
+                            ) -> AsyncIterator[np.ndarray]:
+    """
+    Replay recorded spectra at the acquisition interval, as a stand-in for
+    the spectrometer.
+
+    Parameters:
+    spectra (numpy.ndarray): The (n_spectra, n_wavenumbers) spectra,
+    possibly memory-mapped.
+    interval (float): The seconds between spectra.
+
+    Yields:
+    numpy.ndarray: The spectra.
+    """
+    start = time.perf_counter()
+    for index in range(spectra.shape[0]):
+        # Sleep to the schedule rather than by the interval, so the replay
+        # does not drift
+        await asyncio.sleep(max(0.0, start + index * interval
+                                - time.perf_counter()))
+        yield np.asarray(spectra[index], dtype=np.float64)
+
+
+async def _enqueue(source: AsyncIterator[np.ndarray],
+                   queue: asyncio.Queue, dropped: list[int]) -> None:
+    """
+    Put the spectra of a source on a bounded queue with their arrival time,
+    dropping the oldest spectrum when the queue is full.
+
+    Parameters:
+    source (AsyncIterator): The spectra source.
+    queue (asyncio.Queue): The bounded queue; None is put after the last
+    spectrum.
+    dropped (list): A one element counter of the dropped spectra.
+    """
+    def put(item) -> None:
+        if queue.full():
+            queue.get_nowait()
+            dropped[0] += 1
+        queue.put_nowait(item)
+
+    index = 0
+    try:
+        async for spectrum in source:
+            put((index, time.perf_counter(), spectrum))
+            index += 1
+    finally:
+        # Also ends the monitor when the source fails
+        put(None)
+
+
+async def monitor_nucleation(source: AsyncIterator[np.ndarray],
+                             components: np.ndarray,
+                             nucleation_component: int,
+                             threshold: float = 0.5,
+                             min_consecutive: int = 3,
+                             max_queued: int = 8) -> AsyncIterator[
+        MonitorEvent]:
+    """
+    Project streamed spectra onto fixed NMF components and detect
+    nucleation.
+
+    The alarm is raised while the nucleation component has carried more
+    than the threshold fraction of the total weight for min_consecutive
+    spectra in a row, so a single noisy spectrum does not trigger it. At
+    most max_queued spectra wait for their projection; older ones are
+    dropped, which bounds the latency when the source outpaces the
+    monitor. Spectra that are not finite or do not have one intensity per
+    wavenumber of the components, e.g. truncated lines, are skipped and
+    counted. Linearly dependent components, whose weights and so alarms
+    would be arbitrary, are rejected with a ValueError.
+
+    Parameters:
+    source (AsyncIterator): The spectra source, e.g. follow_spectra_file,
+    socket_spectra or simulated_spectra.
+    components (numpy.ndarray): The (n_components, n_wavenumbers) fitted H.
+    nucleation_component (int): The index of the nucleation component.
+    threshold (float): The fraction of the total weight raising the alarm.
+    min_consecutive (int): The number of spectra in a row above the
+    threshold raising the alarm.
+    max_queued (int): The number of spectra waiting at most.
+
+    Yields:
+    MonitorEvent: The event of every spectrum monitored.
+    """
+    components = np.asarray(components, dtype=np.float64)
+    if np.linalg.matrix_rank(components) < components.shape[0]:
+        raise ValueError(f"The {components.shape[0]} components are linearly "
+                         f"dependent; fit fewer components")
+    queue = asyncio.Queue(maxsize=max_queued)
+    dropped = [0]
+    producer = asyncio.create_task(_enqueue(source, queue, dropped))
+
+    consecutive = 0
+    malformed = 0
+    try:
+        while (item := await queue.get()) is not None:
+            index, arrival, spectrum = item
+            if (spectrum.shape != components.shape[1:]
+                    or not np.isfinite(spectrum).all()):
+                malformed += 1
+                continue
+            weights = nnls_weights(spectrum[None, :], components)[0]
+            total = weights.sum()
+            fraction = (weights[nucleation_component] / total
+                        if total > 0 else 0.0)
+            consecutive = consecutive + 1 if fraction > threshold else 0
+
+            yield MonitorEvent(index, weights, float(fraction),
+                               consecutive >= min_consecutive,
+                               time.perf_counter() - arrival, dropped[0],
+                               malformed)
+        # Surface the errors of the source
+        await producer
+    finally:
+        producer.cancel()
+
+
+def latency_percentiles(latencies: list[float],
+                        percentiles: tuple[float, ...] = (50, 99)
+                        ) -> dict[float, float]:
+    """
+    Calculate percentiles of the per-spectrum latencies.
+
+    Parameters:
+    latencies (list): The latencies in seconds.
+    percentiles (tuple): The percentiles to calculate.
+
+    Returns:
+    dict: Mapping every percentile to its latency in seconds.
+    """
+    values = np.percentile(latencies, percentiles)
+    return dict(zip(percentiles, values.tolist()))
+
+
+async def _run(source: AsyncIterator[np.ndarray], components: np.ndarray,
+               args: argparse.Namespace) -> None:
+    """
+    Print the alarms of a monitored source and its latency statistics.
+
+    Parameters:
+    source (AsyncIterator): The spectra source.
+    components (numpy.ndarray): The fitted H.
+    args (argparse.Namespace): The parsed command line arguments.
+    """
+    latencies = []
+    alarm = False
+    start = time.perf_counter()
+    event = None
+    async for event in monitor_nucleation(
+            source, components, args.component, args.threshold,
+            args.consecutive, args.max_queued):
+        latencies.append(event.latency)
+        if event.alarm != alarm:
+            alarm = event.alarm
+            state = 'started' if alarm else 'ended'
+            print(f"Nucleation {state} at spectrum {event.index} "
+                  f"(weight fraction {event.fraction:.2f})")
+        if args.verbose:
+            print(f"{event.index}: {np.array2string(event.weights)} "
+                  f"{event.latency * 1000:.2f} ms")
+
+    if not latencies:
+        print("No valid spectra received")
+        return
+    seconds = time.perf_counter() - start
+    percentiles = latency_percentiles(latencies)
+    print(f"Monitored {len(latencies)} spectra in {seconds:.2f} s "
+          f"({len(latencies) / seconds:.1f} spectra/s), "
+          f"{event.dropped} dropped, {event.malformed} malformed; "
+          f"latency p50 "
+          f"{percentiles[50] * 1000:.2f} ms, p99 "
+          f"{percentiles[99] * 1000:.2f} ms")
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """
+    Main function to monitor nucleation on a stream of spectra.
+
+    Parameters:
+    argv (list, optional): The command line arguments, defaults to sys.argv.
+    """
+    parser = argparse.ArgumentParser(
+        description='Detect nucleation on a stream of Raman spectra.')
+    parser.add_argument(
+        'components',
+        help='.npy file of the fitted NMF components (components_)')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        '--file', help='file appended with one spectrum per line')
+    source.add_argument(
+        '--socket', metavar='HOST:PORT',
+        help='TCP stream with one spectrum per line')
+    source.add_argument(
+        '--simulate', metavar='NPY',
+        help='replay the spectra of a .npy file (see save_dataframe_to_npy)')
+    parser.add_argument(
+        '-c', '--component', type=int, required=True,
+        help='index of the nucleation component')
+    parser.add_argument(
+        '-t', '--threshold', type=float, default=0.5,
+        help='fraction of the total weight raising the alarm')
+    parser.add_argument(
+        '--consecutive', type=int, default=3,
+        help='spectra in a row above the threshold raising the alarm')
+    parser.add_argument(
+        '-i', '--interval', type=float, default=ACQUISITION_INTERVAL,
+        help='seconds between replayed spectra')
+    parser.add_argument(
+        '--max-queued', type=int, default=8,
+        help='spectra waiting at most before the oldest are dropped')
+    parser.add_argument(
+        '-v', '--verbose', action='store_true',
+        help='print the weights and latency of every spectrum')
+    args = parser.parse_args(argv)
+
+    components = np.load(args.components)
+    if args.file is not None:
+        stream = follow_spectra_file(args.file)
+    elif args.socket is not None:
+        host, port = args.socket.rsplit(':', 1)
+        stream = socket_spectra(host, int(port))
+    else:
+        stream = simulated_spectra(
+            np.load(args.simulate, mmap_mode='r'), args.interval)
+
+    try:
+        asyncio.run(_run(stream, components, args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
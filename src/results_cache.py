@@ -0,0 +1,141 @@
+"""
+This module provides a disk store for the scores of clustering evaluation
+sweeps, so repeated sweeps only compute the numbers of clusters they have
+not scored before.
+It includes the following functionalities:
+
+1. Building cache keys from the input data, the sweep settings and the
+   versions of the libraries computing the scores.
+2. Loading and storing the scores of every number of clusters.
+3. Evicting the least recently used entries beyond a size bound.
+
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+
+def cache_key(data: np.ndarray, settings: dict) -> str:
+    """
+    Build the cache key of a sweep.
+
+    Parameters:
+    data (numpy.ndarray): The input data of the sweep.
+    settings (dict): The JSON serializable settings the scores depend on.
+
+    Returns:
+    str: A hex digest of the data, its shape, the settings and the numpy,
+    scipy, scikit-learn and pandas versions.
+    """
+    import pandas as pd
+    import scipy
+    import sklearn
+
+    data = np.ascontiguousarray(data, dtype=np.float64)
+    digest = hashlib.sha256(data)
+    digest.update(json.dumps({
+        'shape': data.shape,
+        'settings': settings,
+        'versions': [np.__version__, scipy.__version__,
+                     sklearn.__version__, pd.__version__],
+    }, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def _entry_path(cache_dir: str, key: str) -> Path:
+    """
+    Return the path of the file holding the scores of a cache key.
+
+    Parameters:
+    cache_dir (str): The cache directory.
+    key (str): The cache key.
+
+    Returns:
+    pathlib.Path: The path of the .json entry.
+    """
+    return Path(cache_dir) / f'{key}.json'
+
+
+def load_scores(cache_dir: str, key: str) -> dict[int, list[float]]:
+    """
+    Load the cached scores of a sweep and mark the entry as recently used.
+
+    Parameters:
+    cache_dir (str): The cache directory.
+    key (str): The cache key.
+
+    Returns:
+    dict: Mapping the cached numbers of clusters to their scores; empty if
+    nothing is cached or the entry cannot be read.
+    """
+    path = _entry_path(cache_dir, key)
+    try:
+        with open(path, 'r') as file:
+            scores = json.load(file)
+        os.utime(path)
+    except (OSError, ValueError):
+        return {}
+    return {int(i): values for i, values in scores.items()}
+
+
+def store_scores(cache_dir: str, key: str,
+                 scores: dict[int, list[float]],
+                 max_bytes: Optional[int] = None) -> None:
+    """
+    Store the scores of a sweep, then evict the least recently used entries
+    until the cache fits in max_bytes.
+
+    The entry is written to a temporary file and renamed, so concurrent
+    sweeps never read a partial entry.
+
+    Parameters:
+    cache_dir (str): The cache directory.
+    key (str): The cache key.
+    scores (dict): Mapping the numbers of clusters to their scores.
+    max_bytes (int, optional): The size bound of the cache directory.
+    """
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    path = _entry_path(cache_dir, key)
+    with tempfile.NamedTemporaryFile('w', dir=cache_dir, suffix='.tmp',
+                                     delete=False) as file:
+        json.dump({str(i): values for i, values in scores.items()}, file)
+    os.replace(file.name, path)
+
+    if max_bytes is not None:
+        evict(cache_dir, max_bytes, keep=path)
+
+
+def evict(cache_dir: str, max_bytes: int,
+          keep: Optional[Path] = None) -> None:
+    """
+    Delete the least recently used entries until the cache fits in
+    max_bytes.
+
+    Parameters:
+    cache_dir (str): The cache directory.
+    max_bytes (int): The size bound of the cache directory.
+    keep (pathlib.Path, optional): An entry never to delete, such as the
+    one just written.
+    """
+    entries = []
+    for path in Path(cache_dir).glob('*.json'):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        path.unlink(missing_ok=True)
+        total -= size
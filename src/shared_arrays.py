@@ -0,0 +1,107 @@
+"""
+This module provides functions to share numpy arrays with worker processes
+through shared memory instead of pickling them for every task.
+It includes the following functionalities:
+
+1. Resolving the number of worker processes from an n_jobs argument.
+2. Creating arrays backed by shared memory.
+3. Attaching to shared arrays from worker processes.
+
+"""
+
+import os
+from multiprocessing import shared_memory
+from typing import Optional
+
+import numpy as np
+
+
+def effective_n_jobs(n_jobs: Optional[int]) -> int:
+    """
+    Resolve the number of worker processes, following the scikit-learn
+    convention.
+
+    Parameters:
+    n_jobs (int, optional): The requested number of processes. None means 1
+    and negative values count back from the number of CPUs (-1 uses all).
+
+    Returns:
+    int: The number of worker processes.
+    """
+    if n_jobs is None:
+        return 1
+    if n_jobs == 0:
+        raise ValueError("n_jobs == 0 has no meaning")
+    if n_jobs < 0:
+        return max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+    return n_jobs
+
+
+def create_shared_array(shape: tuple[int, ...], dtype: type) -> tuple[
+    shared_memory.SharedMemory,
+    np.ndarray,
+    tuple
+                ]:
+    """
+    Create an uninitialized array backed by a new shared memory block.
+
+    The caller owns the block and must close and unlink it once the workers
+    are done with it.
+
+    Parameters:
+    shape (tuple): The shape of the array.
+    dtype (type): The data type of the array.
+
+    Returns:
+    tuple: Containing
+                the shared memory block,
+                the array viewing it,
+                and the descriptor passed to attach_shared_array.
+    """
+    dtype = np.dtype(dtype)
+    size = max(1, int(np.prod(shape)) * dtype.itemsize)
+    block = shared_memory.SharedMemory(create=True, size=size)
+    array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    return block, array, (block.name, shape, dtype.str)
+
+
+def share_array(array: np.ndarray) -> tuple[
+    shared_memory.SharedMemory,
+    np.ndarray,
+    tuple
+                ]:
+    """
+    Copy an array into a new shared memory block.
+
+    Parameters:
+    array (numpy.ndarray): The array to share.
+
+    Returns:
+    tuple: As returned by create_shared_array.
+    """
+    array = np.asarray(array)
+    block, shared, descriptor = create_shared_array(array.shape, array.dtype)
+    shared[...] = array
+    return block, shared, descriptor
+
+
+def attach_shared_array(descriptor: tuple) -> tuple[
+    shared_memory.SharedMemory,
+    np.ndarray
+                ]:
+    """
+    Attach to an array shared by create_shared_array or share_array.
+
+    The returned block has to be kept referenced as long as the array is in
+    use.
+
+    Parameters:
+    descriptor (tuple): The descriptor of the shared array.
+
+    Returns:
+    tuple: Containing the shared memory block and the array viewing it.
+    """
+    name, shape, dtype = descriptor
+    block = shared_memory.SharedMemory(name=name)
+    array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    return block, array
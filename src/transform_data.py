@@ -5,38 +5,136 @@ It includes the following functionalities:
 1. Loading and reformatting spectra data from a .txt file.
 2. Adding a timestamp column to the DataFrame.
 3. Saving the DataFrame to a .csv file.
+4. Saving and loading the DataFrame as a binary .npy file with a .json
+   sidecar holding the wavenumbers and timestamps.
+5. Converting a .txt file straight to a memory-mapped .npy file and opening
+   it without reading the intensities into memory.
+6. Converting many raw files in parallel from the command line.
+
+pandas is imported by the functions building DataFrames when they are first
+called, so the .npy conversion workers never load it.
 
 """
 
-import pandas as pd
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
 import numpy as np
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 
-def load_and_reformat_spectra(file_path: str) -> pd.DataFrame:
+def _count_spectra_rows(file_path: str) -> tuple[int, int]:
+    """
+    Count the data rows and columns of a spectra .txt file without parsing
+    the values.
+    Parameters:
+    file_path (str): The path to the .txt file containing the spectra data.
+    Returns:
+    tuple: The number of data rows (wavenumbers) and the number of columns
+    (wavenumber column plus one column per spectrum).
+    """
+    n_rows = 0
+    n_columns = 0
+    with open(file_path, 'rb') as file:
+        for line in file:
+            line = line.split(b'#', 1)[0].strip()
+            if not line:
+                continue
+            if n_rows == 0:
+                n_columns = len(line.split())
+            n_rows += 1
+    return n_rows, n_columns
+
+
+def _read_spectra_into(file_path: str, headers: np.ndarray,
+                       spectra: np.ndarray, chunk_rows: int) -> None:
+    """
+    Parse a spectra .txt file in row blocks into preallocated buffers.
+    Parameters:
+    file_path (str): The path to the .txt file containing the spectra data.
+    headers (numpy.ndarray): Buffer receiving the wavenumbers.
+    spectra (numpy.ndarray): Spectra-by-wavenumber buffer receiving the
+    intensities.
+    chunk_rows (int): The number of wavenumber rows parsed per block.
+    """
+    n_wavenumbers = headers.shape[0]
+    n_columns = spectra.shape[0] + 1
+    start = 0
+    with open(file_path, 'r') as file:
+        while start < n_wavenumbers:
+            block = np.loadtxt(file, max_rows=chunk_rows, ndmin=2)
+            if block.shape[1] != n_columns:
+                raise ValueError(
+                    f"Expected {n_columns} columns in {file_path}, "
+                    f"found {block.shape[1]}")
+            stop = start + block.shape[0]
+            headers[start:stop] = block[:, 0]
+            spectra[:, start:stop] = block[:, 1:].T
+            start = stop
+
+
+def load_and_reformat_spectra(file_path: str,
+                              dtype: type = np.float64,
+                              chunk_rows: int = 128) -> pd.DataFrame:
     """
     Load and reformat spectra data from a .txt file.
+
+    The file is parsed in blocks of ``chunk_rows`` wavenumber rows with the
+    numpy C tokenizer, and every block is written straight into a
+    preallocated spectra-by-wavenumber buffer, so the full matrix is held in
+    memory only once.
     Parameters:
     file_path (str): The path to the .txt file containing the spectra data.
+    dtype (type): The floating point type of the intensities.
+    chunk_rows (int): The number of wavenumber rows parsed per block.
     Returns:
     pd.DataFrame: The reformatted DataFrame.
     """
-    # Load the data from the .txt file
-    data = np.loadtxt(file_path, skiprows=0)
+    import pandas as pd
 
-    # Extract the first column as headers
+    n_wavenumbers, n_columns = _count_spectra_rows(file_path)
+    if n_columns < 2:
+        raise ValueError(f"No spectra found in {file_path}")
 
-    headers = data[:, 0]  # Raman Shift in cm-1
-    spectra = data[:, 1:]  # Intensity
+    # Raman Shift in cm-1
+    headers = np.empty(n_wavenumbers, dtype=np.float64)
+    # Intensity, one row per spectrum. The buffer is Fortran ordered so every
+    # block of wavenumber rows from the file is a contiguous write.
+    spectra = np.empty((n_columns - 1, n_wavenumbers), dtype=dtype,
+                       order='F')
 
-    # Transpose the rest of the DataFrame
-    spectra_transposed = spectra.T
+    _read_spectra_into(file_path, headers, spectra, chunk_rows)
 
-    # Convert the transposed array to a DataFrame and assign the headers
-    df_transposed = pd.DataFrame(spectra_transposed, columns=headers)
+    # Wrap the buffer without copying it and assign the headers
+    df_transposed = pd.DataFrame(spectra, columns=headers, copy=False)
 
     return df_transposed
 
 
+def _timestamps(num_rows: int, interval: float) -> np.ndarray:
+    """
+    Build the timestamps of consecutive spectra.
+    Parameters:
+    num_rows (int): The number of spectra.
+    interval (float): The interval in seconds between each timestamp.
+    Returns:
+    numpy.ndarray: The timestamps in seconds.
+    """
+    # A float stop can round to one timestamp more than num_rows
+    return np.arange(num_rows) * interval
+
+
 def add_timestamp_column(df: pd.DataFrame, interval: float) -> pd.DataFrame:
     """
     Add a timestamp column to the DataFrame.
@@ -47,9 +145,7 @@ def add_timestamp_column(df: pd.DataFrame, interval: float) -> pd.DataFrame:
     Returns:
     pd.DataFrame: The DataFrame with the added timestamp column.
     """
-    num_rows = df.shape[0]
-    timestamps = np.arange(0, num_rows * interval, interval)
-    df.insert(0, 'time', timestamps)
+    df.insert(0, 'time', _timestamps(df.shape[0], interval))
     return df
 
 
@@ -64,32 +160,345 @@ def save_dataframe_to_csv(df: pd.DataFrame, csv_file_path: str) -> None:
     print(f"Data has been successfully saved to {csv_file_path}")
 
 
-def main() -> None:
+def _sidecar_path(npy_file_path: str) -> Path:
+    """
+    Return the path of the .json sidecar belonging to a .npy file.
+    Parameters:
+    npy_file_path (str): The path of the .npy file.
+    Returns:
+    pathlib.Path: The path of the .json sidecar.
+    """
+    return Path(npy_file_path).with_suffix('.json')
+
+
+def _write_sidecar(npy_file_path: str, wavenumbers: np.ndarray,
+                   timestamps: Optional[np.ndarray]) -> None:
+    """
+    Write the .json sidecar holding the wavenumbers and timestamps.
+    Parameters:
+    npy_file_path (str): The path of the .npy file.
+    wavenumbers (numpy.ndarray): The wavenumbers of the columns.
+    timestamps (numpy.ndarray, optional): The timestamps of the rows, if any.
+    """
+    metadata = {
+        'wavenumbers': wavenumbers.tolist(),
+        'time': timestamps.tolist() if timestamps is not None else None,
+    }
+    with open(_sidecar_path(npy_file_path), 'w') as file:
+        json.dump(metadata, file)
+
+
+def save_dataframe_to_npy(df: pd.DataFrame, npy_file_path: str) -> None:
+    """
+    Save the DataFrame as a binary .npy file with a .json sidecar.
+
+    The intensities are written as a single time-by-wavenumber array, while
+    the wavenumbers and the optional 'time' column are stored in the sidecar
+    next to it, so no headers have to be parsed back from strings.
+    Parameters:
+    df (pd.DataFrame): The DataFrame to be saved.
+    npy_file_path (str): The path to save the .npy file.
+    """
+    spectra = df.drop(columns='time', errors='ignore')
+
+    np.save(npy_file_path, spectra.to_numpy())
+    _write_sidecar(npy_file_path, spectra.columns.astype(float).to_numpy(),
+                   df['time'].to_numpy() if 'time' in df.columns else None)
+    print(f"Data has been successfully saved to {npy_file_path}")
+
+
+def load_dataframe_from_npy(npy_file_path: str,
+                            mmap_mode: Optional[str] = None) -> pd.DataFrame:
+    """
+    Load a DataFrame saved with save_dataframe_to_npy.
+    Parameters:
+    npy_file_path (str): The path of the .npy file.
+    mmap_mode (str, optional): If given, memory-map the intensities with this
+    numpy mode ('r', 'r+', 'c') instead of reading them into memory.
+    Returns:
+    pd.DataFrame: The DataFrame with the 'time' column first (if it was
+    saved) followed by one column per wavenumber.
+    """
+    import pandas as pd
+
+    with open(_sidecar_path(npy_file_path), 'r') as file:
+        metadata = json.load(file)
+
+    spectra = np.load(npy_file_path, mmap_mode=mmap_mode)
+    df = pd.DataFrame(spectra, columns=metadata['wavenumbers'], copy=False)
+    if metadata['time'] is not None:
+        df.insert(0, 'time', metadata['time'])
+    return df
+
+
+def convert_spectra_to_npy(file_path: str, npy_file_path: str,
+                           interval: float,
+                           dtype: type = np.float64,
+                           chunk_rows: int = 128) -> None:
+    """
+    Convert a spectra .txt file to the .npy format without holding the
+    matrix in memory.
+
+    The row blocks parsed from the .txt file are written straight into a
+    memory-mapped .npy file, which gets the same layout and sidecar as
+    load_and_reformat_spectra followed by add_timestamp_column and
+    save_dataframe_to_npy.
+    Parameters:
+    file_path (str): The path to the .txt file containing the spectra data.
+    npy_file_path (str): The path to save the .npy file.
+    interval (float): The interval in seconds between each timestamp.
+    dtype (type): The floating point type of the intensities.
+    chunk_rows (int): The number of wavenumber rows parsed per block.
+    """
+    n_wavenumbers, n_columns = _count_spectra_rows(file_path)
+    if n_columns < 2:
+        raise ValueError(f"No spectra found in {file_path}")
+
+    headers = np.empty(n_wavenumbers, dtype=np.float64)
+    spectra = np.lib.format.open_memmap(
+        npy_file_path, mode='w+', dtype=dtype,
+        shape=(n_columns - 1, n_wavenumbers), fortran_order=True)
+    _read_spectra_into(file_path, headers, spectra, chunk_rows)
+    spectra.flush()
+    del spectra
+
+    _write_sidecar(npy_file_path, headers,
+                   _timestamps(n_columns - 1, interval))
+    print(f"Data has been successfully saved to {npy_file_path}")
+
+
+def open_spectra_memmap(npy_file_path: str,
+                        mode: str = 'r') -> tuple[np.ndarray, pd.DataFrame]:
+    """
+    Open a .npy spectra file as a memory-mapped array and a DataFrame view.
+
+    Neither the array nor the DataFrame copies the intensities: both read
+    from the mapped file, so campaigns larger than the available memory can
+    be passed to the evaluation functions.
+    Parameters:
+    npy_file_path (str): The path of the .npy file.
+    mode (str): The numpy memory-map mode ('r', 'r+', 'c').
+    Returns:
+    tuple: Containing
+                the memory-mapped time-by-wavenumber array,
+                and a DataFrame view of it with the wavenumbers as columns
+                and the timestamps (if saved) as index.
+    """
+    import pandas as pd
+
+    with open(_sidecar_path(npy_file_path), 'r') as file:
+        metadata = json.load(file)
+
+    spectra = np.load(npy_file_path, mmap_mode=mode)
+    index = (pd.Index(metadata['time'], name='time')
+             if metadata['time'] is not None else None)
+    df = pd.DataFrame(spectra, index=index, columns=metadata['wavenumbers'],
+                      copy=False)
+    return spectra, df
+
+
+def collect_input_files(patterns: list[str]) -> list[Path]:
+    """
+    Collect the raw spectra files matching directories or glob patterns.
+    Parameters:
+    patterns (list): Directories (all .txt files in them are used), file
+    paths or glob patterns.
+    Returns:
+    list: The sorted, de-duplicated paths of the matching files.
+    """
+    input_paths = set()
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_dir():
+            input_paths.update(path.glob('*.txt'))
+        else:
+            input_paths.update(Path(match) for match in glob.glob(pattern))
+    return sorted(path for path in input_paths if path.is_file())
+
+
+def _input_root(input_paths: list[Path]) -> Path:
+    """
+    Find the deepest directory containing all raw spectra files.
+    Parameters:
+    input_paths (list): The raw spectra files.
+    Returns:
+    pathlib.Path: The common directory of the files.
+    """
+    return Path(os.path.commonpath(
+        [path.resolve().parent for path in input_paths]))
+
+
+def _output_path(input_path: Path, input_root: Path, output_dir: str,
+                 output_format: str) -> Path:
+    """
+    Build the path of the processed file for a raw spectra file.
+
+    The directories of the raw file below the input root are kept below the
+    output directory, so raw files with the same name in different
+    directories get different processed files.
+    Parameters:
+    input_path (pathlib.Path): The raw spectra file.
+    input_root (pathlib.Path): The common directory of the raw files, see
+    _input_root.
+    output_dir (str): The directory of the processed files.
+    output_format (str): The output format, either 'csv' or 'npy'.
+    Returns:
+    pathlib.Path: The path of the processed file.
+    """
+    relative_dir = input_path.resolve().parent.relative_to(input_root)
+    return (Path(output_dir) / relative_dir
+            / f'{input_path.stem}_reformatted.{output_format}')
+
+
+def _is_up_to_date(input_path: Path, output_path: Path) -> bool:
+    """
+    Check whether a processed file is newer than its raw spectra file.
+    Parameters:
+    input_path (pathlib.Path): The raw spectra file.
+    output_path (pathlib.Path): The processed file.
+    Returns:
+    bool: True if the processed file (and its sidecar, for .npy files)
+    exists and is not older than the raw file.
+    """
+    outputs = [output_path]
+    if output_path.suffix == '.npy':
+        outputs.append(_sidecar_path(output_path))
+    input_mtime = input_path.stat().st_mtime
+    return all(path.exists() and path.stat().st_mtime >= input_mtime
+               for path in outputs)
+
+
+def convert_file(input_file_path: str, output_file_path: str,
+                 interval: float,
+                 output_format: str = 'csv') -> tuple[int, float]:
+    """
+    Convert one raw spectra file into a processed .csv or .npy file.
+    Parameters:
+    input_file_path (str): The path to the .txt file containing the spectra.
+    output_file_path (str): The path to save the processed file.
+    interval (float): The interval in seconds between each timestamp.
+    output_format (str): The output format, either 'csv' or 'npy'.
+    Returns:
+    tuple: Containing the number of converted spectra and the conversion
+    time in seconds.
+    """
+    start = time.perf_counter()
+    if output_format == 'npy':
+        convert_spectra_to_npy(input_file_path, output_file_path, interval)
+        n_spectra = np.load(output_file_path, mmap_mode='r').shape[0]
+    elif output_format == 'csv':
+        df = load_and_reformat_spectra(input_file_path)
+        df_with_timestamp = add_timestamp_column(df, interval)
+        save_dataframe_to_csv(df_with_timestamp, output_file_path)
+        n_spectra = df_with_timestamp.shape[0]
+    else:
+        raise ValueError(f"Unknown output format: {output_format}")
+    return n_spectra, time.perf_counter() - start
+
+
+def convert_files(input_paths: list[Path], output_dir: str,
+                  interval: float,
+                  output_format: str = 'csv',
+                  n_jobs: Optional[int] = None,
+                  force: bool = False) -> bool:
+    """
+    Convert many raw spectra files on a process pool and report the
+    throughput of every file.
+    Parameters:
+    input_paths (list): The raw spectra files.
+    output_dir (str): The directory of the processed files.
+    interval (float): The interval in seconds between each timestamp.
+    output_format (str): The output format, either 'csv' or 'npy'.
+    n_jobs (int, optional): The number of worker processes, defaults to the
+    number of CPUs.
+    force (bool): Convert files even if their output is up to date.
+    Returns:
+    bool: True if every conversion succeeded.
+    """
+    input_root = _input_root(input_paths) if input_paths else None
+
+    jobs = {}
+    for input_path in input_paths:
+        output_path = _output_path(input_path, input_root, output_dir,
+                                   output_format)
+        if not force and _is_up_to_date(input_path, output_path):
+            print(f"Skipping {input_path}: {output_path} is up to date")
+            continue
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        jobs[input_path] = output_path
+
+    succeeded = True
+
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        futures = {
+            executor.submit(convert_file, str(input_path), str(output_path),
+                            interval, output_format): input_path
+            for input_path, output_path in jobs.items()
+        }
+        for future in as_completed(futures):
+            input_path = futures[future]
+            try:
+                n_spectra, seconds = future.result()
+            except Exception as error:
+                print(f"Conversion of {input_path} failed: {error}")
+                succeeded = False
+                continue
+            megabytes = input_path.stat().st_size / 1e6
+            print(f"Converted {input_path}: {n_spectra} spectra in "
+                  f"{seconds:.2f} s ({n_spectra / seconds:.0f} spectra/s, "
+                  f"{megabytes / seconds:.1f} MB/s)")
+    return succeeded
+
+
+def main(argv: Optional[list[str]] = None) -> None:
     """
     Main function to execute the data loading, reformatting,
-    timestamp addition, and saving to CSV.
+    timestamp addition, and saving to CSV or NPY.
 
     This function performs the following steps:
-    1. Defines the file paths for input and output.
+    1. Parses the input files, output directory and format from the
+       command line, defaulting to the bundled dataset.
     2. Specifies the time interval between each timestamp.
-    3. Loads and reformats the spectra data from a .txt file.
+    3. Loads and reformats the spectra data from every .txt file.
     4. Adds a timestamp column to the DataFrame.
-    5. Saves the reformatted DataFrame to a .csv file.
-    """
-
-    # Define the file paths
-    input_file_path = './data/raw/Raman_spectra_data.txt'
-    output_csv_file_path = (
-        './data/processed/Raman_spectra_data_reformatted.csv'
-    )
-
-    interval = 0.04562  # Time interval in seconds as defined in the paper
-    # Load and reformat the spectra data
-    df = load_and_reformat_spectra(input_file_path)
-    # Add the timestamp column
-    df_with_timestamp = add_timestamp_column(df, interval)
-    # Save the reformatted DataFrame to a .csv file
-    save_dataframe_to_csv(df_with_timestamp, output_csv_file_path)
+    5. Saves the reformatted DataFrame to a .csv or .npy file, skipping
+       files whose output is up to date.
+
+    Exits with status 1 if the conversion of any file fails.
+
+    Parameters:
+    argv (list, optional): The command line arguments, defaults to sys.argv.
+    """
+    parser = argparse.ArgumentParser(
+        description='Reformat raw Raman spectra .txt exports.')
+    parser.add_argument(
+        'inputs', nargs='*', default=['./data/raw/Raman_spectra_data.txt'],
+        help='raw spectra files, directories or glob patterns')
+    parser.add_argument(
+        '-o', '--output-dir', default='./data/processed',
+        help='directory of the processed files')
+    parser.add_argument(
+        '-f', '--format', dest='output_format', choices=('csv', 'npy'),
+        default='csv', help='output format')
+    # Time interval in seconds as defined in the paper
+    parser.add_argument(
+        '-i', '--interval', type=float, default=0.04562,
+        help='time interval in seconds between spectra')
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=None,
+        help='number of worker processes (default: number of CPUs)')
+    parser.add_argument(
+        '--force', action='store_true',
+        help='convert files even if their output is up to date')
+    args = parser.parse_args(argv)
+
+    input_paths = collect_input_files(args.inputs)
+    if not input_paths:
+        parser.error(f"No input files match {' '.join(args.inputs)}")
+
+    if not convert_files(input_paths, args.output_dir, args.interval,
+                         args.output_format, args.jobs, args.force):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,27 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+DATA_PATH = (Path(__file__).resolve().parents[1] / 'data' / 'processed'
+             / 'Raman_spectra_data_reformatted.csv')
+
+
+@pytest.fixture(scope='session')
+def spectra() -> pd.DataFrame:
+    """
+    The bundled Raman spectra, one row per spectrum and one column per
+    wavenumber.
+    """
+    return pd.read_csv(DATA_PATH).drop(columns='time')
+
+
+@pytest.fixture(scope='session')
+def standardized_spectra(spectra: pd.DataFrame) -> np.ndarray:
+    """
+    The bundled spectra standardized as compute_metrics does.
+    """
+    from sklearn.preprocessing import StandardScaler
+
+    return StandardScaler().fit_transform(spectra)
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from sklearn.cluster import AgglomerativeClustering, ward_tree
+from sklearn.metrics import calinski_harabasz_score, davies_bouldin_score
+
+from src.evaluation_metrics_hierarchical_clustering import (
+    _calinski_harabasz_from_statistics, _davies_bouldin_from_statistics,
+    calculate_wcss, compute_metrics, connectivity_graph, cut_tree,
+    tree_cut_statistics)
+
+
+def same_partition(labels: np.ndarray, other_labels: np.ndarray) -> bool:
+    """
+    Check whether two labelings describe the same partition, whatever the
+    label values.
+    """
+    pairs = set(zip(labels.tolist(), other_labels.tolist()))
+    return len(pairs) == len(set(labels)) == len(set(other_labels))
+
+
+@pytest.mark.parametrize('with_connectivity', [False, True])
+def test_cut_tree_matches_agglomerative_clustering(standardized_spectra,
+                                                   with_connectivity):
+    X = standardized_spectra
+    connectivity = connectivity_graph(X) if with_connectivity else None
+    children, _, n_leaves, _ = ward_tree(X, connectivity=connectivity)
+
+    for n_clusters in range(1, 10):
+        expected = AgglomerativeClustering(
+            n_clusters=n_clusters, linkage='ward',
+            connectivity=connectivity).fit_predict(X)
+        assert same_partition(cut_tree(children, n_leaves, n_clusters),
+                              expected)
+
+
+def test_cut_tree_matches_agglomerative_clustering_on_random_data():
+    X = np.random.default_rng(0).normal(size=(200, 5))
+    children, _, n_leaves, _ = ward_tree(X)
+
+    for n_clusters in (1, 2, 7, 50, 200):
+        expected = AgglomerativeClustering(
+            n_clusters=n_clusters, linkage='ward').fit_predict(X)
+        assert same_partition(cut_tree(children, n_leaves, n_clusters),
+                              expected)
+
+
+def test_incremental_metrics_match_sklearn_on_random_data():
+    X = np.random.default_rng(0).normal(size=(200, 5))
+    children, _, n_leaves, _ = ward_tree(X)
+    cluster_number = range(2, 30)
+    statistics = tree_cut_statistics(X, children, n_leaves, cluster_number)
+
+    for i in cluster_number:
+        labels = cut_tree(children, n_leaves, i)
+        assert np.isclose(statistics[i][2].sum(), calculate_wcss(X, labels))
+        assert np.isclose(
+            _calinski_harabasz_from_statistics(statistics[i], n_leaves),
+            calinski_harabasz_score(X, labels))
+        assert np.isclose(
+            _davies_bouldin_from_statistics(statistics[i], n_leaves),
+            davies_bouldin_score(X, labels))
+
+
+def test_incremental_compute_metrics_matches_sklearn(spectra):
+    cluster_number = range(2, 15)
+    wcss, silhouette, calinski_harabasz, davies_bouldin = compute_metrics(
+        spectra, cluster_number)
+    incremental = compute_metrics(spectra, cluster_number, incremental=True)
+
+    np.testing.assert_allclose(incremental[0], wcss)
+    np.testing.assert_array_equal(incremental[1], silhouette)
+    np.testing.assert_allclose(incremental[2], calinski_harabasz)
+    np.testing.assert_allclose(incremental[3], davies_bouldin)
+
+
+@pytest.mark.parametrize('incremental', [False, True])
+def test_parallel_compute_metrics_matches_serial(spectra, incremental):
+    cluster_number = range(2, 8)
+    serial = compute_metrics(spectra, cluster_number,
+                             incremental=incremental,
+                             precompute_distances=True)
+    parallel = compute_metrics(spectra, cluster_number,
+                               incremental=incremental,
+                               precompute_distances=True, n_jobs=2)
+
+    for serial_scores, parallel_scores in zip(serial, parallel):
+        np.testing.assert_allclose(parallel_scores, serial_scores)
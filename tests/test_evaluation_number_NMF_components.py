@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from src.evaluation_number_NMF_components import (calculate_residuals,
+                                                  nnls_weights)
+from src.nmf_solvers import nnls_block_principal_pivoting
+
+
+@pytest.fixture(scope='module')
+def scaled_spectra(spectra) -> np.ndarray:
+    """
+    The bundled spectra rescaled to [0, 1], as the notebook feeds the NMF.
+    """
+    X = spectra.to_numpy(dtype=np.float64)
+    return (X - X.min()) / (X.max() - X.min())
+
+
+@pytest.mark.parametrize('batch_size', [None, 32])
+def test_parallel_residuals_match_serial(scaled_spectra, batch_size):
+    n_components_range = range(2, 6)
+    serial = calculate_residuals(scaled_spectra, n_components_range,
+                                 batch_size=batch_size, n_epochs=5)
+    parallel = calculate_residuals(scaled_spectra, n_components_range,
+                                   batch_size=batch_size, n_epochs=5,
+                                   n_jobs=2)
+
+    np.testing.assert_allclose(parallel, serial)
+
+
+def test_nnls_weights_match_scipy(scaled_spectra):
+    from scipy.optimize import nnls
+
+    components = np.random.default_rng(0).random((8, scaled_spectra.shape[1]))
+    W = nnls_weights(scaled_spectra, components, block_rows=16)
+
+    expected = np.array([nnls(components.T, x)[0] for x in scaled_spectra])
+    np.testing.assert_allclose(W, expected, atol=1e-8)
+
+
+@pytest.mark.parametrize('max_iter', [0, 100])
+def test_block_principal_pivoting_matches_scipy(max_iter):
+    from scipy.optimize import nnls
+
+    rng = np.random.default_rng(0)
+    A = rng.normal(size=(30, 10))
+    B = rng.normal(size=(30, 50))
+    X = nnls_block_principal_pivoting(A.T @ A, A.T @ B, max_iter)
+
+    expected = np.column_stack([nnls(A, b)[0] for b in B.T])
+    np.testing.assert_allclose(X, expected, atol=1e-8)
+
+
+def test_nnls_weights_warn_on_dependent_components(scaled_spectra):
+    components = np.random.default_rng(0).random((3, scaled_spectra.shape[1]))
+    components = np.vstack((components, components[0] + components[1]))
+
+    with pytest.warns(RuntimeWarning):
+        W = nnls_weights(scaled_spectra, components)
+    assert np.all(W >= 0)